@@ -0,0 +1,152 @@
+'''
+Cache das opções resolvidas pelos autocompletes do formulário de tarefas.
+
+Os valores digitados nos autocompletes (escritórios e envolvidos do de-para e o
+tipo "Prazo Agendado") se repetem entre as tarefas. Depois da primeira seleção
+pela interface, o texto e o valor oculto escolhidos são guardados por campo e
+valor em autocomplete.json, e as tarefas seguintes preenchem os dois campos
+diretamente, sem a ida ao servidor do autocomplete. Os mesmos valores ocultos
+alimentam o motor HTTP quando o de-para não traz as colunas de ID.
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+import json
+import os
+import threading
+import time
+from de_para import normalizar_chave
+from envio_http import CAMPO_ENVOLVIDO, CAMPO_ID_ENVOLVIDO
+from espera import selecionar_autocomplete
+from estado import caminho_estado
+from logs import log_step, numero_env
+from passos import chamar
+
+ARQUIVO_CACHE = "autocomplete.json"
+VERSAO_CACHE = 1
+
+# (campo de texto, campo oculto, setas até a opção) de cada autocomplete do formulário
+ESCRITORIO_ORIGEM = ("input#SourceOfficeText", "input#SourceOffice", 4)
+ESCRITORIO_RESPONSAVEL = ("input#ResponsibleOfficeText", "input#ResponsibleOffice", 4)
+TIPO = ("input#TipoText", "input#Tipo", 1)
+ENVOLVIDO = (f'input[name="{CAMPO_ENVOLVIDO}"]', f'input[name="{CAMPO_ID_ENVOLVIDO}"]', 1)
+TIPO_PADRAO = "Prazo Agendado"
+
+# Preenche o texto e o valor oculto e dispara os eventos de alteração, como faz o autocomplete
+JS_APLICAR = """([seletorTexto, seletorId, texto, valor]) => {
+    const campoTexto = document.querySelector(seletorTexto);
+    const campoId = document.querySelector(seletorId);
+    if (!campoTexto || !campoId) return false;
+    campoTexto.value = texto;
+    campoId.value = valor;
+    for (const campo of [campoTexto, campoId]) campo.dispatchEvent(new Event('change', {bubbles: true}));
+    return true;
+}"""
+
+JS_LER = """([seletorTexto, seletorId]) => {
+    const campoTexto = document.querySelector(seletorTexto);
+    const campoId = document.querySelector(seletorId);
+    return campoTexto && campoId ? [campoTexto.value, campoId.value] : null;
+}"""
+
+def cache_ativo():
+    '''Indica se o cache de autocomplete está habilitado (AUTOTASK_CACHE_AUTOCOMPLETE, padrão "1").'''
+    return os.getenv("AUTOTASK_CACHE_AUTOCOMPLETE", "1") != "0"
+
+class CacheAutocomplete:
+    '''Opções resolvidas por (campo, valor), persistidas entre execuções.'''
+
+    def __init__(self):
+        self.validade_s = numero_env("AUTOTASK_VALIDADE_AUTOCOMPLETE_DIAS", 7, float) * 24 * 3600
+        self._lock = threading.Lock()
+        self._entradas = None
+        self._alterado = False
+
+    @staticmethod
+    def _chave(campo, valor):
+        return f"{campo[0]}|{campo[2]}|{normalizar_chave(valor)}"
+
+    def _carregar(self):
+        if self._entradas is not None:
+            return
+        self._entradas = {}
+        caminho = caminho_estado(ARQUIVO_CACHE)
+        if not caminho.exists():
+            return
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                dados = json.load(arquivo)
+            if dados.get("versao") == VERSAO_CACHE:
+                self._entradas = dados.get("entradas", {})
+        except (OSError, ValueError) as e:
+            log_step(f"[ERRO] Cache de autocomplete inválido, será reconstruído: {e}")
+
+    def obter(self, campo, valor):
+        '''Retorna (texto, valor oculto) guardados para o valor no campo, ou None.'''
+        if not valor:
+            return None
+        with self._lock:
+            self._carregar()
+            entrada = self._entradas.get(self._chave(campo, valor))
+        if entrada is None or time.time() - entrada["ts"] > self.validade_s:
+            return None
+        return entrada["texto"], entrada["id"]
+
+    def registrar(self, campo, valor, texto, id_oculto):
+        '''Guarda a opção escolhida para o valor no campo.'''
+        if not valor or not texto or not id_oculto:
+            return
+        with self._lock:
+            self._carregar()
+            self._entradas[self._chave(campo, valor)] = {"texto": texto, "id": id_oculto, "ts": time.time()}
+            self._alterado = True
+
+    def invalidar(self, *valores):
+        '''Remove as entradas dos valores informados (por exemplo, após uma tarefa que falhou).'''
+        sufixos = {f"|{normalizar_chave(valor)}" for valor in valores if valor}
+        with self._lock:
+            self._carregar()
+            removidas = [chave for chave in self._entradas if any(chave.endswith(sufixo) for sufixo in sufixos)]
+            for chave in removidas:
+                del self._entradas[chave]
+            self._alterado = self._alterado or bool(removidas)
+
+    def salvar(self):
+        '''Grava o cache se houve alteração.'''
+        with self._lock:
+            if not self._alterado:
+                return
+            try:
+                caminho = caminho_estado(ARQUIVO_CACHE)
+                temporario = caminho.with_suffix(".tmp")
+                with open(temporario, "w", encoding="utf-8") as arquivo:
+                    json.dump({"versao": VERSAO_CACHE, "entradas": self._entradas}, arquivo, ensure_ascii=False)
+                os.replace(temporario, caminho)
+                self._alterado = False
+            except Exception as e:
+                log_step(f"[ERRO] Não foi possível salvar o cache de autocomplete: {e}")
+
+CACHE_AUTOCOMPLETE = CacheAutocomplete()
+
+def preencher_autocomplete(campo, valor, selecionar=None):
+    """
+    Passos que preenchem o autocomplete `campo` com o valor guardado no cache.
+    Sem cache (ou se os campos não existirem na página), escolhem a opção pela
+    interface, com os passos de `selecionar()` quando informado, e guardam o
+    texto e o valor oculto resultantes.
+    """
+    seletor_texto, seletor_id, setas = campo
+    if cache_ativo():
+        resolvido = CACHE_AUTOCOMPLETE.obter(campo, valor)
+        if resolvido is not None and (yield chamar("evaluate", JS_APLICAR, [seletor_texto, seletor_id, *resolvido])):
+            return True
+
+    if selecionar is None:
+        sucesso = yield from selecionar_autocomplete(valor, setas, seletor_texto, seletor_id)
+    else:
+        sucesso = yield from selecionar()
+    if sucesso and cache_ativo():
+        lido = yield chamar("evaluate", JS_LER, [seletor_texto, seletor_id])
+        if lido:
+            CACHE_AUTOCOMPLETE.registrar(campo, valor, *lido)
+    return sucesso
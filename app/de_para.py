@@ -0,0 +1,141 @@
+'''
+Tabela de-para de Responsável para Escritório/Envolvido.
+
+A planilha é compilada uma única vez em um dicionário indexado pelo Responsável
+normalizado (sem espaços extras, acentos e diferença de maiúsculas) e o
+resultado é guardado em cache binário no diretório de estado. O cache é
+invalidado quando a data de modificação ou o conteúdo da planilha mudam, de
+forma que o pandas só é necessário para recompilar a tabela. O build otimizado
+distribui a tabela já compilada (extensão .pickle), dispensando a planilha e o
+pandas no executável.
+'''
+# pylint: disable=broad-exception-caught
+
+import hashlib
+import os
+import pickle
+import unicodedata
+from estado import caminho_estado
+from logs import log_step
+
+ARQUIVO_CACHE = "de_para.pickle"
+VERSAO_CACHE = 1
+EXTENSAO_COMPILADA = ".pickle"
+
+def normalizar_chave(texto):
+    '''Normaliza o Responsável para busca: sem acentos, sem espaços extras e sem distinção de maiúsculas.'''
+    if texto is None:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.split()).casefold()
+
+def _hash_arquivo(caminho_arquivo):
+    sha = hashlib.sha256()
+    with open(caminho_arquivo, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def _valor_nativo(valor):
+    # Converte escalares do numpy para tipos nativos e descarta células vazias (NaN)
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float) and valor != valor: # pylint: disable=comparison-with-itself
+        return None
+    return valor
+
+def compilar_de_para(caminho_arquivo):
+    '''Lê a planilha e monta o dicionário {Responsável normalizado: dados da linha}.'''
+    import pandas as pd # pylint: disable=import-outside-toplevel
+
+    mapa = {}
+    for registro in pd.read_excel(caminho_arquivo).to_dict(orient="records"):
+        dados = {coluna: _valor_nativo(valor) for coluna, valor in registro.items()}
+        dados = {coluna: valor for coluna, valor in dados.items() if valor is not None}
+        # Mantém a primeira ocorrência, como na busca original
+        mapa.setdefault(normalizar_chave(dados.get('Responsável')), dados)
+    mapa.pop("", None)
+    return mapa
+
+def _ler_cache():
+    caminho = caminho_estado(ARQUIVO_CACHE)
+    if not caminho.exists():
+        return None
+    try:
+        with open(caminho, "rb") as arquivo:
+            cache = pickle.load(arquivo)
+        return cache if cache.get("versao") == VERSAO_CACHE else None
+    except Exception as e:
+        log_step(f"[ERRO] Cache do de-para inválido, a planilha será recompilada: {e}")
+        return None
+
+def _gravar_cache(cache):
+    caminho = caminho_estado(ARQUIVO_CACHE)
+    temporario = caminho.with_suffix(".tmp")
+    try:
+        with open(temporario, "wb") as arquivo:
+            pickle.dump(cache, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+    except Exception as e:
+        log_step(f"[ERRO] Não foi possível gravar o cache do de-para: {e}")
+
+def exportar_de_para(caminho_planilha, destino):
+    '''Compila a planilha e grava a tabela pronta para ser distribuída com o executável.'''
+    mapa = compilar_de_para(caminho_planilha)
+    with open(destino, "wb") as arquivo:
+        pickle.dump({"versao": VERSAO_CACHE, "hash": _hash_arquivo(caminho_planilha), "mapa": mapa}, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    return mapa
+
+def carregar_de_para(caminho_arquivo):
+    """
+    Carrega a tabela de-para compilada, usando o cache enquanto a planilha não
+    for alterada. Um arquivo .pickle gerado por exportar_de_para é lido direto.
+    """
+    if str(caminho_arquivo).endswith(EXTENSAO_COMPILADA):
+        with open(caminho_arquivo, "rb") as arquivo:
+            compilado = pickle.load(arquivo)
+        if compilado.get("versao") != VERSAO_CACHE:
+            raise ValueError(f"Versão da tabela de-para compilada incompatível: {caminho_arquivo}")
+        return compilado["mapa"]
+
+    estatisticas = os.stat(caminho_arquivo)
+    assinatura = (estatisticas.st_mtime_ns, estatisticas.st_size)
+    cache = _ler_cache()
+    if cache and cache["assinatura"] == assinatura:
+        return cache["mapa"]
+
+    # Data de modificação diferente não significa necessariamente conteúdo diferente
+    hash_arquivo = _hash_arquivo(caminho_arquivo)
+    if cache and cache["hash"] == hash_arquivo:
+        mapa = cache["mapa"]
+    else:
+        log_step("Compilando a tabela de-para.")
+        mapa = compilar_de_para(caminho_arquivo)
+    _gravar_cache({"versao": VERSAO_CACHE, "assinatura": assinatura, "hash": hash_arquivo, "mapa": mapa})
+    return mapa
+
+ENVOLVIDO_PADRAO = 'Advogado Responsável'
+ESCRITORIO_PADRAO = 'Escritório de Advocacia e Advogados Associados / Diretoria'
+
+def resolver_destino(de_para, coordenacao):
+    """
+    Retorna (escritório, envolvido, dados do de-para) para a coordenação,
+    usando os valores padrão quando não houver correspondência.
+    """
+    envolvido = ENVOLVIDO_PADRAO
+    escritorio = ESCRITORIO_PADRAO
+    dados_depara = buscar_dados(de_para, coordenacao)
+
+    if dados_depara:
+        envolvido = dados_depara.get('Envolvido', envolvido)
+        escritorio = dados_depara.get('Escritório', escritorio)
+    else:
+        log_step(f"[ERRO] Não foi possível encontrar dados de-para para {str(coordenacao)}")
+    return escritorio, envolvido, dados_depara
+
+def buscar_dados(de_para, pessoa_responsavel):
+    """
+    Busca os dados correspondentes ao Responsável do Escritório na tabela de-para.
+    """
+    return de_para.get(normalizar_chave(pessoa_responsavel))  # Retorna None se não houver correspondência
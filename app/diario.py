@@ -0,0 +1,190 @@
+'''
+Diário local de trabalho (SQLite) para execuções retomáveis.
+
+Cada ID_LAWSYSTEM é registrado como pendente, em andamento, concluído, falhou
+ou descartado, com a contagem de tentativas. Registros pendentes de uma
+execução interrompida são retomados na próxima, falhas transitórias são
+tentadas novamente com backoff exponencial e registros que continuam falhando
+vão para a lista de descartados, deixando de consumir tempo do navegador.
+
+Uso para consultar os descartados:
+    python app/diario.py
+'''
+# pylint: disable=line-too-long
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from estado import caminho_estado
+from logs import log_step, numero_env
+
+PENDENTE = "pendente"
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+DESCARTADO = "descartado"
+
+# Intervalo máximo entre tentativas, independente da quantidade de falhas
+BACKOFF_MAXIMO_S = 6 * 3600
+# Registros concluídos há mais tempo que isso são removidos do diário
+RETENCAO_CONCLUIDOS_S = 30 * 24 * 3600
+
+def diario_ativo():
+    '''Indica se o diário está habilitado (AUTOTASK_DIARIO, padrão "1").'''
+    return os.getenv("AUTOTASK_DIARIO", "1") != "0"
+
+class Diario:
+    '''Estado de cada registro entre execuções, gravado em SQLite.'''
+
+    def __init__(self, caminho=None):
+        self.max_tentativas = numero_env("AUTOTASK_MAX_TENTATIVAS", 5, minimo=1)
+        self.backoff_base = numero_env("AUTOTASK_BACKOFF_BASE_S", 60, float, minimo=0.0)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(caminho or caminho_estado("diario.sqlite3")), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS trabalho (
+                id_lawsystem PRIMARY KEY,
+                estado TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_tentativa REAL NOT NULL DEFAULT 0,
+                ultimo_erro TEXT,
+                dados TEXT,
+                atualizado REAL NOT NULL
+            )
+        """)
+        # Registros em andamento de uma execução interrompida voltam a ficar pendentes
+        with self._conn:
+            self._conn.execute("DELETE FROM trabalho WHERE estado=? AND atualizado<?", (CONCLUIDO, time.time() - RETENCAO_CONCLUIDOS_S))
+            retomados = self._conn.execute("UPDATE trabalho SET estado=? WHERE estado=?", (PENDENTE, EM_ANDAMENTO)).rowcount
+        if retomados:
+            log_step(f"{retomados} registros interrompidos na execução anterior serão retomados.")
+        self._entregues = set()
+        # Últimas contagens registradas no log, para não repeti-las a cada consulta do modo serviço
+        self._ultimos_retomados = 0
+        self._ultimos_ignorados = 0
+
+    def _executar(self, sql, parametros=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, parametros)
+
+    def _consultar(self, sql, parametros=()):
+        with self._lock:
+            return self._conn.execute(sql, parametros).fetchall()
+
+    def nova_rodada(self):
+        '''Inicia uma nova rodada de leitura; no modo serviço ela se repete a cada consulta.'''
+        self._entregues = set()
+
+    def pendentes(self):
+        '''Registros pendentes ou com nova tentativa vencida, guardados de execuções anteriores.'''
+        self.nova_rodada()
+        linhas = self._consultar(
+            "SELECT id_lawsystem, dados FROM trabalho WHERE dados IS NOT NULL AND (estado=? OR (estado=? AND proxima_tentativa<=?))",
+            (PENDENTE, FALHOU, time.time()),
+        )
+        if linhas and len(linhas) != self._ultimos_retomados:
+            log_step(f"Retomando {len(linhas)} registros do diário.")
+        self._ultimos_retomados = len(linhas)
+        for id_lawsystem, dados in linhas:
+            self._entregues.add(id_lawsystem)
+            yield json.loads(dados)
+
+    def filtrar(self, registros, reenviar_concluido=None):
+        """
+        Repassa apenas os registros que devem ir ao navegador, registrando os novos
+        como pendentes. Registros já concluídos localmente (cuja gravação no banco
+        não chegou a acontecer) são repassados a `reenviar_concluido` em vez de
+        gerar uma nova tarefa.
+        """
+        ignorados = 0
+        for row in registros:
+            id_lawsystem = row["ID_LAWSYSTEM"]
+            if id_lawsystem in self._entregues:
+                continue
+            linha = self._consultar("SELECT estado, proxima_tentativa FROM trabalho WHERE id_lawsystem=?", (id_lawsystem,))
+            if linha:
+                estado, proxima = linha[0]
+                if estado == CONCLUIDO:
+                    if reenviar_concluido is not None:
+                        reenviar_concluido(id_lawsystem)
+                    continue
+                if estado == DESCARTADO or (estado == FALHOU and proxima > time.time()):
+                    ignorados += 1
+                    continue
+            else:
+                self._executar(
+                    "INSERT INTO trabalho (id_lawsystem, estado, dados, atualizado) VALUES (?, ?, ?, ?)",
+                    (id_lawsystem, PENDENTE, json.dumps(row, default=str), time.time()),
+                )
+            self._entregues.add(id_lawsystem)
+            yield row
+        if ignorados and ignorados != self._ultimos_ignorados:
+            log_step(f"{ignorados} registros ignorados por estarem descartados ou aguardando nova tentativa.")
+        self._ultimos_ignorados = ignorados
+
+    def iniciar(self, id_lawsystem):
+        '''Marca o registro como em andamento e conta a tentativa.'''
+        self._executar(
+            "UPDATE trabalho SET estado=?, tentativas=tentativas+1, atualizado=? WHERE id_lawsystem=?",
+            (EM_ANDAMENTO, time.time(), id_lawsystem),
+        )
+
+    def concluir(self, id_lawsystem):
+        '''Marca o registro como concluído.'''
+        self._executar(
+            "UPDATE trabalho SET estado=?, ultimo_erro=NULL, dados=NULL, atualizado=? WHERE id_lawsystem=?",
+            (CONCLUIDO, time.time(), id_lawsystem),
+        )
+
+    def falhar(self, id_lawsystem, erro, permanente=False):
+        """
+        Registra a falha. Falhas transitórias são reagendadas com backoff
+        exponencial; falhas permanentes, ou após o limite de tentativas, vão
+        para os descartados.
+        """
+        linha = self._consultar("SELECT tentativas FROM trabalho WHERE id_lawsystem=?", (id_lawsystem,))
+        tentativas = linha[0][0] if linha else 1
+        if permanente or tentativas >= self.max_tentativas:
+            self._executar(
+                "UPDATE trabalho SET estado=?, ultimo_erro=?, atualizado=? WHERE id_lawsystem=?",
+                (DESCARTADO, str(erro), time.time(), id_lawsystem),
+            )
+            log_step(f"[ERRO] Registro descartado após {tentativas} tentativas: id andamento={id_lawsystem}: {erro}")
+            return
+        espera = min(self.backoff_base * 2 ** (tentativas - 1), BACKOFF_MAXIMO_S)
+        self._executar(
+            "UPDATE trabalho SET estado=?, ultimo_erro=?, proxima_tentativa=?, atualizado=? WHERE id_lawsystem=?",
+            (FALHOU, str(erro), time.time() + espera, time.time(), id_lawsystem),
+        )
+
+    def descartar(self, id_lawsystem, motivo):
+        '''Registra diretamente como descartado um registro rejeitado antes do processamento.'''
+        self._executar(
+            """
+            INSERT INTO trabalho (id_lawsystem, estado, ultimo_erro, atualizado) VALUES (?, ?, ?, ?)
+            ON CONFLICT(id_lawsystem) DO UPDATE SET estado=excluded.estado, ultimo_erro=excluded.ultimo_erro, dados=NULL, atualizado=excluded.atualizado
+            """,
+            (id_lawsystem, DESCARTADO, motivo, time.time()),
+        )
+
+    def descartados(self):
+        '''Lista (id, tentativas, último erro, data) dos registros descartados.'''
+        return self._consultar(
+            "SELECT id_lawsystem, tentativas, ultimo_erro, atualizado FROM trabalho WHERE estado=? ORDER BY atualizado",
+            (DESCARTADO,),
+        )
+
+    def fechar(self):
+        '''Fecha a conexão com o diário.'''
+        with self._lock:
+            self._conn.close()
+
+if __name__ == "__main__":
+    diario = Diario()
+    for id_descartado, tentativas_feitas, ultimo_erro, atualizado in diario.descartados():
+        print(f"[INFO] id andamento={id_descartado} tentativas={tentativas_feitas} em {datetime.fromtimestamp(atualizado):%d/%m/%Y %H:%M} erro={ultimo_erro}")
+    diario.fechar()
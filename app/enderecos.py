@@ -0,0 +1,18 @@
+'''
+Endereços do LawSystem usados pela automação.
+
+LAWSYSTEM_URL e LAWSYSTEM_HOST_INICIAL permitem apontar a automação para outro
+servidor, como o servidor simulado usado nos benchmarks.
+'''
+import os
+
+URL_BASE = os.getenv("LAWSYSTEM_URL", "https://example.com").rstrip("/")
+URL_LOGIN = f"{URL_BASE}/login"
+URL_VERIFICACAO_SESSAO = f"{URL_BASE}/tarefas"
+URL_CADASTRO = URL_BASE + "/tarefas/createFromAndamento?idAnd={idadamento}&pId={idprocesso}"
+
+# Texto da página exibida pelo LawSystem após salvar uma tarefa
+MARCADOR_SUCESSO = "A página solicitada não foi encontrada."
+
+# Trecho da URL da página inicial carregada após um login bem-sucedido
+HOST_INICIAL = os.getenv("LAWSYSTEM_HOST_INICIAL", "firm.lawsystem.com.br")
@@ -0,0 +1,203 @@
+'''
+Motor HTTP para o cadastro de tarefas, sem interação com a interface.
+
+Reaproveita os cookies da sessão do Playwright (APIRequestContext do contexto
+autenticado), lê o formulário de createFromAndamento para obter o token
+anti-forgery e os valores padrão, e envia os mesmos campos preenchidos por
+preencher_formulario diretamente ao servidor.
+
+A interface chega ao campo de envolvido com Tabs, sem um seletor conhecido, e
+remove os lembretes pelo botão "Remover lembrete"; os nomes desses campos no
+formulário são presumidos (EnvolvidoText, EnvolvidoId e o prefixo Lembretes) e
+podem ser ajustados pelas variáveis LAWSYSTEM_CAMPO_*. Se algum campo
+preenchido pela automação não existir no formulário recebido, nada é enviado e
+a tarefa segue pelo navegador.
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+import os
+from functools import lru_cache
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from logs import log_step
+from metricas import medir
+from enderecos import URL_CADASTRO, MARCADOR_SUCESSO
+from espera import avaliar_resposta_salvamento
+
+# Campos ocultos preenchidos pelos autocompletes da página
+CAMPO_ID_ESCRITORIO_ORIGEM = "SourceOffice"
+CAMPO_ID_ESCRITORIO_RESPONSAVEL = "ResponsibleOffice"
+CAMPO_ID_TIPO = "Tipo"
+CAMPO_ENVOLVIDO = os.getenv("LAWSYSTEM_CAMPO_ENVOLVIDO", "EnvolvidoText")
+CAMPO_ID_ENVOLVIDO = os.getenv("LAWSYSTEM_CAMPO_ID_ENVOLVIDO", "EnvolvidoId")
+
+# Prefixo dos campos de lembrete removidos via "Remover lembrete" na interface
+PREFIXO_LEMBRETES = os.getenv("LAWSYSTEM_PREFIXO_LEMBRETES", "Lembretes")
+
+# Campos que montar_campos preenche e que precisam existir no formulário recebido
+CAMPOS_PREENCHIDOS = (
+    "SourceOfficeText", CAMPO_ID_ESCRITORIO_ORIGEM, "ResponsibleOfficeText", CAMPO_ID_ESCRITORIO_RESPONSAVEL,
+    "Descricao", "TipoText", CAMPO_ID_TIPO, "DtInicial", "HrFinal", "DtFinal",
+    CAMPO_ENVOLVIDO, CAMPO_ID_ENVOLVIDO, "ButtonSave",
+)
+
+# Formulários incompatíveis já avisados no log, para não repetir o aviso a cada registro
+_avisos = set()
+
+MOTOR_NAVEGADOR = "navegador"
+MOTOR_HTTP = "http"
+
+@lru_cache(maxsize=None)
+def obter_motor():
+    '''Retorna o motor configurado em AUTOTASK_MOTOR ("navegador" ou "http").'''
+    motor = os.getenv("AUTOTASK_MOTOR", MOTOR_NAVEGADOR).strip().lower()
+    if motor not in (MOTOR_NAVEGADOR, MOTOR_HTTP):
+        log_step(f"[ERRO] Motor desconhecido em AUTOTASK_MOTOR: {motor}. Utilizando '{MOTOR_NAVEGADOR}'.")
+        return MOTOR_NAVEGADOR
+    return motor
+
+class _LeitorFormulario(HTMLParser):
+    '''Extrai action, método e campos dos formulários de uma página HTML.'''
+
+    def __init__(self):
+        super().__init__()
+        self.formularios = []
+        self._atual = None
+        self._textarea = None
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            self._atual = {"action": attrs.get("action") or "", "method": (attrs.get("method") or "get").lower(), "campos": {}, "botoes": set()}
+            self.formularios.append(self._atual)
+            return
+        if tag == "option" and self._atual is not None and self._select:
+            # Sem opção marcada, o navegador envia a primeira
+            valor = attrs.get("value") or ""
+            if "selected" in attrs or self._select not in self._atual["campos"]:
+                self._atual["campos"][self._select] = valor
+            return
+        if self._atual is None or not attrs.get("name"):
+            return
+
+        nome = attrs["name"]
+        if tag == "input":
+            tipo = (attrs.get("type") or "text").lower()
+            if tipo in ("submit", "button", "image", "reset"):
+                self._atual["botoes"].add(nome)
+            elif tipo in ("checkbox", "radio"):
+                if "checked" in attrs:
+                    self._atual["campos"][nome] = attrs.get("value") or "on"
+            else:
+                self._atual["campos"].setdefault(nome, attrs.get("value") or "")
+        elif tag == "button":
+            self._atual["botoes"].add(nome)
+        elif tag == "textarea":
+            self._textarea = nome
+            self._atual["campos"][nome] = ""
+        elif tag == "select":
+            self._select = nome
+
+    def handle_data(self, data):
+        if self._atual is not None and self._textarea:
+            self._atual["campos"][self._textarea] += data
+
+    def handle_endtag(self, tag):
+        if tag == "textarea":
+            self._textarea = None
+        elif tag == "select":
+            self._select = None
+        elif tag == "form":
+            self._atual = None
+
+def extrair_formulario(html):
+    '''Retorna o formulário de cadastro (o que contém o botão ButtonSave), ou None.'''
+    leitor = _LeitorFormulario()
+    leitor.feed(html)
+    for formulario in leitor.formularios:
+        if "ButtonSave" in formulario["botoes"]:
+            return formulario
+    return None
+
+def montar_campos(padroes, escritorio, envolvido, ids):
+    '''
+    Combina os valores padrão do formulário com os campos preenchidos pela
+    automação. `ids` contém os valores ocultos já resolvidos dos autocompletes.
+    '''
+    campos = {nome: valor for nome, valor in padroes.items() if not nome.startswith(PREFIXO_LEMBRETES)}
+    campos.update({
+        "SourceOfficeText": escritorio,
+        CAMPO_ID_ESCRITORIO_ORIGEM: ids[CAMPO_ID_ESCRITORIO_ORIGEM],
+        "ResponsibleOfficeText": escritorio,
+        CAMPO_ID_ESCRITORIO_RESPONSAVEL: ids[CAMPO_ID_ESCRITORIO_RESPONSAVEL],
+        "Descricao": "Conferir expediente no PJe",
+        "TipoText": "Prazo Agendado",
+        CAMPO_ID_TIPO: ids[CAMPO_ID_TIPO],
+        "DtInicial": datetime.now().strftime("%d/%m/%Y"),
+        "HrFinal": "23:00:00",
+        "DtFinal": (datetime.now() + timedelta(days=1)).strftime("%d/%m/%Y"),
+        CAMPO_ENVOLVIDO: envolvido,
+        CAMPO_ID_ENVOLVIDO: ids[CAMPO_ID_ENVOLVIDO],
+        "ButtonSave": "1",
+    })
+    # Equivale a desmarcar o checkbox "Maintain"
+    campos.pop("Maintain", None)
+    return campos
+
+def campos_ausentes(formulario):
+    '''Campos preenchidos pela automação (e os lembretes a remover) que não existem no formulário.'''
+    existentes = set(formulario["campos"]) | formulario["botoes"]
+    ausentes = [nome for nome in CAMPOS_PREENCHIDOS if nome not in existentes]
+    if not any(nome.startswith(PREFIXO_LEMBRETES) for nome in formulario["campos"]):
+        ausentes.append(f"{PREFIXO_LEMBRETES}*")
+    return ausentes
+
+def ids_completos(ids):
+    '''Indica se todos os valores ocultos necessários para o envio HTTP estão disponíveis.'''
+    campos = (CAMPO_ID_ESCRITORIO_ORIGEM, CAMPO_ID_ESCRITORIO_RESPONSAVEL, CAMPO_ID_TIPO, CAMPO_ID_ENVOLVIDO)
+    return all(ids.get(campo) for campo in campos)
+
+@medir("envio_http")
+def enviar_tarefa_http(request, idadamento, idprocesso, escritorio, envolvido, ids, timeout=15000):
+    '''
+    Cria a tarefa via HTTP usando o APIRequestContext da sessão autenticada.
+    Retorna True se o servidor confirmou o cadastro, False se o envio falhou e
+    None se o formulário nem chegou a ser enviado (seguro refazer pelo navegador).
+    '''
+    url = URL_CADASTRO.format(idadamento=idadamento, idprocesso=idprocesso)
+    try:
+        resposta = request.get(url, timeout=timeout)
+        if not resposta.ok:
+            log_step(f"[ERRO] Falha ao carregar o formulário via HTTP ({resposta.status}) para id andamento={idadamento}")
+            return None
+
+        formulario = extrair_formulario(resposta.text())
+        if formulario is None:
+            log_step(f"[ERRO] Formulário de cadastro não encontrado via HTTP para id andamento={idadamento}")
+            return None
+
+        ausentes = campos_ausentes(formulario)
+        if ausentes:
+            aviso = ", ".join(ausentes)
+            if aviso not in _avisos:
+                _avisos.add(aviso)
+                log_step(f"[ERRO] Campos não encontrados no formulário de cadastro ({aviso}); envio HTTP desativado para esses registros, seguindo pelo navegador. Ajuste LAWSYSTEM_CAMPO_ENVOLVIDO, LAWSYSTEM_CAMPO_ID_ENVOLVIDO ou LAWSYSTEM_PREFIXO_LEMBRETES.")
+            return None
+
+        campos = montar_campos(formulario["campos"], escritorio, envolvido, ids)
+        destino = urljoin(resposta.url, formulario["action"]) if formulario["action"] else resposta.url
+    except Exception as e:
+        log_step(f"[ERRO] Erro ao carregar o formulário via HTTP para id andamento={idadamento}: {e}")
+        return None
+
+    try:
+        resposta = request.post(destino, form=campos, timeout=timeout)
+        texto = resposta.text()
+        # Mesma classificação do navegador: a página exibida após salvar costuma vir com 404
+        return avaliar_resposta_salvamento(resposta.status, resposta.url, MARCADOR_SUCESSO in texto, extrair_formulario(texto) is not None)
+    except Exception as e:
+        log_step(f"[ERRO] Erro no envio HTTP para id andamento={idadamento}: {e}")
+        return False
@@ -0,0 +1,169 @@
+'''
+Camada de esperas por eventos da página, substituindo pausas fixas.
+
+Cada espera aguarda a condição que realmente importa (dropdown do autocomplete
+visível, opção destacada alterada, campo oculto preenchido) respeitando um
+orçamento de tempo por etapa. Em caso de timeout a espera apenas retorna False,
+mantendo o fluxo tolerante como era com as pausas fixas. As esperas são
+passos (ver passos.py), executados tanto pelo motor síncrono quanto pelo
+assíncrono.
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+from logs import log_step, numero_env
+from enderecos import URL_LOGIN
+from passos import chamar
+
+TIMEOUT_ETAPA_MS = numero_env("AUTOTASK_TIMEOUT_ETAPA_MS", 5000)
+TIMEOUT_SALVAMENTO_MS = numero_env("AUTOTASK_TIMEOUT_SALVAMENTO_MS", 10000)
+INTERVALO_POLLING_MS = 50
+
+# Cada autocomplete da página tem sua própria lista; interessa apenas a que estiver visível
+SELETOR_AUTOCOMPLETE = "ul.ui-autocomplete:visible"
+# jQuery UI >= 1.12 destaca a opção com .ui-state-active; versões anteriores, com .ui-state-focus
+SELETOR_OPCAO_ATIVA = "ul.ui-autocomplete .ui-state-active, ul.ui-autocomplete .ui-state-focus"
+
+SELETOR_SALVAR = 'button[name="ButtonSave"][value="1"]'
+
+# [marcador de sucesso presente, botão Salvar presente] na página carregada após o envio
+JS_RESULTADO_SALVAMENTO = "([marcador, seletor]) => [!!document.body && document.body.textContent.includes(marcador), !!document.querySelector(seletor)]"
+
+# Retorna o elemento destacado dentro de uma lista visível, ignorando listas fechadas
+JS_OPCAO_ATIVA = "sel => [...document.querySelectorAll(sel)].find(el => el.getClientRects().length > 0)"
+
+# Campo preenchido; se o campo não existir na página, basta que nenhuma lista de autocomplete esteja aberta
+JS_CAMPO_PREENCHIDO = (
+    "sel => { const el = document.querySelector(sel);"
+    " if (el) return !!el.value;"
+    " return ![...document.querySelectorAll('ul.ui-autocomplete')].some(ul => ul.getClientRects().length > 0); }"
+)
+
+def aguardar_condicao(condicao, timeout=TIMEOUT_ETAPA_MS):
+    '''
+    Avalia os passos de `condicao()` periodicamente até que retornem verdadeiro
+    ou o tempo acabe. Utiliza page.wait_for_timeout para que os eventos do
+    Playwright continuem sendo processados durante a espera.
+    '''
+    decorrido = 0
+    while True:
+        try:
+            if (yield from condicao()):
+                return True
+        except Exception:
+            pass
+        if decorrido >= timeout:
+            return False
+        yield chamar("wait_for_timeout", INTERVALO_POLLING_MS)
+        decorrido += INTERVALO_POLLING_MS
+
+def avaliar_resposta_salvamento(status, url, marcador, formulario):
+    """
+    Classifica o envio do formulário de cadastro pela resposta (status e URL
+    final) e pela página resultante. O marcador de sucesso decide primeiro: a
+    página que o LawSystem exibe após salvar costuma vir com status 404. Sem o
+    marcador, só conta como tarefa salva uma resposta 2xx/3xx que não voltou ao
+    login nem reexibiu o formulário (`formulario`); qualquer outro status,
+    inclusive 0 (navegação sem resposta), é falha.
+
+    >>> avaliar_resposta_salvamento(404, "/tarefas/salvo", True, False)
+    True
+    >>> avaliar_resposta_salvamento(200, "/tarefas/salvo", False, False)
+    True
+    >>> avaliar_resposta_salvamento(400, "/tarefas/salvo", False, False)
+    False
+    >>> avaliar_resposta_salvamento(403, "/tarefas/salvo", False, False)
+    False
+    >>> avaliar_resposta_salvamento(500, "/tarefas/salvo", False, False)
+    False
+    >>> avaliar_resposta_salvamento(0, "/tarefas/salvo", False, False)
+    False
+    >>> avaliar_resposta_salvamento(200, URL_LOGIN, False, False)
+    False
+    >>> avaliar_resposta_salvamento(200, "/tarefas/novo", False, True)
+    False
+    """
+    if marcador:
+        return True
+    if not 200 <= status < 400:
+        return False
+    return not (url.startswith(URL_LOGIN) or formulario)
+
+def aguardar_autocomplete(timeout=TIMEOUT_ETAPA_MS):
+    '''Aguarda o dropdown do autocomplete ficar visível.'''
+    try:
+        yield chamar("wait_for_selector", SELETOR_AUTOCOMPLETE, state="visible", timeout=timeout)
+        return True
+    except Exception:
+        log_step(f"[ERRO] Dropdown do autocomplete não apareceu em {timeout} ms.")
+        return False
+
+def aguardar_autocomplete_fechado(timeout=TIMEOUT_ETAPA_MS):
+    '''Aguarda o dropdown do autocomplete ser fechado após a seleção.'''
+    try:
+        yield chamar("wait_for_selector", SELETOR_AUTOCOMPLETE, state="hidden", timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+def texto_opcao_ativa():
+    '''Retorna o texto da opção destacada no autocomplete, ou None.'''
+    return (yield chamar(
+        "evaluate",
+        f"sel => {{ const el = ({JS_OPCAO_ATIVA})(sel); return el ? el.textContent : null; }}",
+        SELETOR_OPCAO_ATIVA,
+    ))
+
+def aguardar_mudanca_opcao(anterior, timeout=TIMEOUT_ETAPA_MS):
+    '''Aguarda a opção destacada do autocomplete ser diferente de `anterior`.'''
+    try:
+        yield chamar(
+            "wait_for_function",
+            f"([sel, anterior]) => {{ const el = ({JS_OPCAO_ATIVA})(sel); return !!el && el.textContent !== anterior; }}",
+            arg=[SELETOR_OPCAO_ATIVA, anterior],
+            timeout=timeout,
+        )
+        return True
+    except Exception:
+        log_step(f"[ERRO] Opção destacada do autocomplete não mudou em {timeout} ms.")
+        return False
+
+def aguardar_campo_preenchido(seletor, timeout=TIMEOUT_ETAPA_MS):
+    '''
+    Aguarda o campo (normalmente oculto) receber um valor não vazio. Se o campo
+    não existir na página, aguarda apenas o dropdown do autocomplete fechar.
+    '''
+    try:
+        yield chamar(
+            "wait_for_function",
+            JS_CAMPO_PREENCHIDO,
+            arg=seletor,
+            timeout=timeout,
+        )
+        return True
+    except Exception:
+        log_step(f"[ERRO] Campo {seletor} não foi preenchido em {timeout} ms.")
+        return False
+
+def selecionar_autocomplete(valor, setas, seletor_texto=None, seletor_id=None, timeout=TIMEOUT_ETAPA_MS):
+    '''
+    Digita o valor no autocomplete, navega `setas` opções com ArrowDown e confirma
+    com Enter, aguardando a resposta da página a cada tecla.
+    Se `seletor_texto` for None, digita no campo que estiver com o foco.
+    '''
+    if seletor_texto:
+        yield chamar("fill", seletor_texto, valor)
+    else:
+        yield chamar("keyboard.type", valor)
+    yield chamar("keyboard.press", "Enter")
+    yield from aguardar_autocomplete(timeout)
+
+    for _ in range(setas):
+        anterior = yield from texto_opcao_ativa()
+        yield chamar("keyboard.press", "ArrowDown")
+        yield from aguardar_mudanca_opcao(anterior, timeout)
+
+    yield chamar("keyboard.press", "Enter")
+    if seletor_id:
+        return (yield from aguardar_campo_preenchido(seletor_id, timeout))
+    return (yield from aguardar_autocomplete_fechado(timeout))
@@ -0,0 +1,12 @@
+'''Localização dos arquivos de estado local mantidos entre execuções.'''
+import os
+from pathlib import Path
+
+def caminho_estado(nome_arquivo):
+    """
+    Retorna o caminho de um arquivo de estado dentro de AUTOTASK_DIR_ESTADO
+    (padrão ~/.autotask), criando o diretório se necessário.
+    """
+    diretorio = Path(os.getenv("AUTOTASK_DIR_ESTADO", str(Path.home() / ".autotask")))
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio / nome_arquivo
@@ -0,0 +1,252 @@
+'''
+Fluxos do LawSystem compartilhados pelos motores síncrono e assíncrono.
+
+Login, verificação da sessão, cadastro da tarefa (navegação, preenchimento e
+salvamento) e o registro da tentativa no diário são escritos uma única vez como
+passos (ver passos.py). main.py os executa com playwright.sync_api e
+motor_async.py com playwright.async_api.
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+import os
+from datetime import datetime, timedelta
+from logs import log_step
+from de_para import resolver_destino
+from enderecos import URL_LOGIN, URL_CADASTRO, HOST_INICIAL, MARCADOR_SUCESSO
+from espera import (
+    JS_RESULTADO_SALVAMENTO, SELETOR_SALVAR, TIMEOUT_SALVAMENTO_MS,
+    aguardar_condicao, selecionar_autocomplete, avaliar_resposta_salvamento,
+)
+from cache_autocomplete import (
+    CACHE_AUTOCOMPLETE, ESCRITORIO_ORIGEM, ESCRITORIO_RESPONSAVEL, TIPO, ENVOLVIDO, TIPO_PADRAO,
+    preencher_autocomplete,
+)
+from metricas import medir_passos
+from passos import CliqueComNavegacao, bloqueante, chamar, ler
+from sessao import salvar_sessao, sessao_valida
+
+SELETOR_ERRO_LOGIN = "#form0 > div > div"
+
+@medir_passos("login")
+def faz_login():
+    ''' Realiza o login e cria a sessão '''
+    try:
+        # Obter credenciais do ambiente
+        username = os.getenv("LAWSYSTEM_USERNAME")
+        password = os.getenv("LAWSYSTEM_PASSWORD")
+        if not username or not password:
+            raise ValueError("Credenciais de login não encontradas nas variáveis de ambiente.")
+
+        # Acessando a página de login
+        yield chamar("goto", URL_LOGIN)
+
+        # Verificar se a página carregou e os campos estão disponíveis
+        yield chamar("wait_for_load_state", "networkidle", timeout=15000)
+        if not ((yield chamar("is_visible", "input#Username")) and (yield chamar("is_visible", "input#Password"))):
+            raise ValueError("Campos de login não encontrados.")
+
+        # Preenchendo os campos de login
+        yield chamar("fill", "input#Username", username)
+        yield chamar("fill", "input#Password", password)
+
+        # Clicando no botão de login
+        yield chamar("click", "button[type='submit']")
+
+        # Aguarde o carregamento da próxima página ou a mensagem de erro
+        def carregou():
+            return HOST_INICIAL in (yield ler("url")) or (yield chamar("is_visible", SELETOR_ERRO_LOGIN))
+        yield from aguardar_condicao(carregou, timeout=15000)
+
+        # Verificar se o login falhou
+        if (yield chamar("is_visible", SELETOR_ERRO_LOGIN)):
+            error_message = yield chamar("text_content", SELETOR_ERRO_LOGIN)
+            raise ValueError(f"Login não realizado: {error_message}")
+
+        # Verificar se o login foi realizado com sucesso
+        if not HOST_INICIAL in (yield ler("url")):
+            raise ValueError("A página inicial não foi carregada corretamente.")
+
+        # Login realizado com sucesso. Iniciando preenchimento de dados
+        return True
+
+    except ValueError as e:
+        log_step(f"[ERRO] {str(e)}")
+        return False
+    except Exception as e:
+        log_step(f"[ERRO] Erro inesperado: {str(e)}")
+        return False
+
+def pagina_utilizavel():
+    '''Passos que verificam se a página ainda responde (não foi fechada e o renderer não travou).'''
+    try:
+        if (yield chamar("is_closed")):
+            return False
+        yield chamar("evaluate", "1")
+        return True
+    except Exception as e:
+        log_step(f"[ERRO] Página do navegador indisponível: {e}")
+        return False
+
+def garantir_sessao():
+    """
+    Reaproveita a sessão atual se ainda for válida; caso contrário refaz o login
+    e salva a nova sessão. O cookie válido não basta: a página precisa continuar
+    utilizável, senão as próximas tarefas falhariam com a sessão dada como ok.
+    """
+    if not (yield from pagina_utilizavel()):
+        log_step("[ERRO] A página do navegador foi fechada ou travou; sessão não pode ser reaproveitada.")
+        return False
+    if (yield from sessao_valida()):
+        return True
+    log_step("Sessão inválida ou expirada, realizando login.")
+    if not (yield from faz_login()):
+        return False
+    yield from salvar_sessao()
+    return True
+
+@medir_passos("navegacao")
+def navegar_para_pagina_cadastro(idadamento, idprocesso):
+    '''Navega para a página de cadastro de tarefas.'''
+    try:
+        yield chamar("goto", URL_CADASTRO.format(idadamento=idadamento, idprocesso=idprocesso), timeout=15000)
+        return True
+    except Exception as e:
+        log_step(f"[ERRO] Falha ao navegar para a página de cadastro: {e}")
+        return False
+
+@medir_passos("preenchimento")
+def preencher_formulario(escritorio, envolvido):
+    '''Preenche o formulário no LawSystem.'''
+    try:
+        # Preenche o campo "SourceOfficeText"
+        yield from preencher_autocomplete(ESCRITORIO_ORIGEM, escritorio)
+
+        # Preenche o campo "ResponsibleOfficeText"
+        yield from preencher_autocomplete(ESCRITORIO_RESPONSAVEL, escritorio)
+
+        # Preenche o campo "Descricao"
+        yield chamar("fill", "input#Descricao", "Conferir expediente no PJe")
+
+        # Preenche o campo "TipoText"
+        yield from preencher_autocomplete(TIPO, TIPO_PADRAO)
+
+        # Preenche o campo "DtInicial" com a data atual
+        yield chamar("fill", "input#DtInicial", datetime.now().strftime("%d/%m/%Y"))
+
+        # Preenche o campo "HrFinal" com um horário padrão
+        yield chamar("fill", "input#HrFinal", "23:00:00")
+
+        # Preenche o campo "DtFinal" com a data de amanhã
+        yield chamar("fill", "input#DtFinal", (datetime.now() + timedelta(days=1)).strftime("%d/%m/%Y"))
+
+        # Preenche o campo de envolvidos, navegando por 6 tabs no for
+        def selecionar_envolvido():
+            for _ in range(7):
+                yield chamar("keyboard.press", "Tab")
+            # Preencher o input onde o cursor parou
+            return (yield from selecionar_autocomplete(envolvido, 1))
+        yield from preencher_autocomplete(ENVOLVIDO, envolvido, selecionar_envolvido)
+
+        # Clicar no botão "Excluir lembrete" dos dois lembretes padrão
+        for _ in range(2):
+            yield chamar("wait_for_selector", 'span[title="Remover lembrete"]')
+            yield chamar("click", 'span[title="Remover lembrete"]')
+
+        # Clicar no checkbox para não manter os dados após salvar
+        yield chamar("click", "input#Maintain")
+        return True
+
+    except Exception as e:
+        log_step(f"[ERRO] Erro ao preencher o formulário: {e}")
+        return False
+
+@medir_passos("verificacao")
+def salvar_e_verificar(timeout=TIMEOUT_SALVAMENTO_MS):
+    """
+    Clica em Salvar e confirma o cadastro pela navegação que o clique dispara:
+    o marcador de sucesso na página carregada e, na falta dele, o status, a URL
+    final e a presença do formulário (ver avaliar_resposta_salvamento), sem
+    serializar a página inteira.
+    """
+    try:
+        resposta = yield CliqueComNavegacao(SELETOR_SALVAR, timeout)
+        marcador, formulario = yield chamar("evaluate", JS_RESULTADO_SALVAMENTO, [MARCADOR_SUCESSO, SELETOR_SALVAR])
+        if resposta is None:
+            return avaliar_resposta_salvamento(0, (yield ler("url")), marcador, formulario)
+        return avaliar_resposta_salvamento(resposta.status, resposta.url, marcador, formulario)
+    except Exception as e:
+        log_step(f"[ERRO] Erro ao verificar o salvamento: {e}")
+        return False
+
+@medir_passos("tarefa")
+def processar_linha(row, de_para, extrair_metadados, gravar, enviar_http=None):
+    """
+    Processa um único registro da consulta e cria a tarefa no LawSystem.
+    `gravar(id_lawsystem)` registra o retorno no banco; com `enviar_http`, a
+    tarefa é enviada primeiro pelo motor HTTP, com o navegador como fallback.
+    """
+    # Extrai dados do banco
+    idadamento = row["ID_LAWSYSTEM"]
+    processo = row["PROCESSO"]
+    idprocesso, coordenacao = extrair_metadados(row)
+
+    # Busca escritórios e envolvidos
+    escritorio, envolvido, dados_depara = resolver_destino(de_para, coordenacao)
+
+    # Motor HTTP: envia o formulário direto ao servidor, com o navegador como fallback
+    if enviar_http is not None:
+        request = yield ler("context.request")
+        enviado = yield bloqueante(enviar_http, request, idadamento, idprocesso, escritorio, envolvido, dados_depara)
+        if enviado:
+            yield bloqueante(gravar, idadamento)
+            log_step(f"Tarefa criada via HTTP para o processo={processo}, coordenação={envolvido}, id andamento={idadamento}")
+            return True
+        if enviado is False:
+            log_step(f"[ERRO] Falha ao criar tarefa via HTTP para id andamento={idadamento}")
+            return False
+
+    # Navega para a página de cadastro
+    if not (yield from navegar_para_pagina_cadastro(idadamento, idprocesso)):
+        return False
+
+    # Preenche o formulário
+    if not (yield from preencher_formulario(escritorio, envolvido)):
+        log_step(f"[ERRO] Formulário não preenchido para id andamento={idadamento}")
+        return False
+
+    # Salva e confirma pela resposta do servidor
+    if (yield from salvar_e_verificar()):
+        yield bloqueante(gravar, idadamento)
+        log_step(f"Tarefa criada com sucesso para o processo={processo}, coordenação={envolvido}, id andamento={idadamento}")
+        return True
+
+    # Um valor guardado no cache pode ter ficado desatualizado; a próxima tentativa resolve pela interface
+    CACHE_AUTOCOMPLETE.invalidar(escritorio, envolvido, TIPO_PADRAO)
+    log_step(f"[ERRO] Falha ao criar tarefa para id andamento={idadamento}")
+    return False
+
+def executar_com_diario(row, diario, tarefa):
+    """
+    Executa os passos de `tarefa` anotando a tentativa e o resultado do registro
+    no diário. Metadados inválidos são falhas permanentes; as demais falhas são
+    tentadas novamente em execuções futuras.
+    """
+    if diario is None:
+        return (yield from tarefa)
+
+    id_lawsystem = row["ID_LAWSYSTEM"]
+    yield bloqueante(diario.iniciar, id_lawsystem)
+    try:
+        sucesso = yield from tarefa
+    except (KeyError, ValueError) as e:
+        yield bloqueante(diario.falhar, id_lawsystem, e, True)
+        raise
+    except Exception as e:
+        yield bloqueante(diario.falhar, id_lawsystem, e)
+        raise
+    if sucesso:
+        yield bloqueante(diario.concluir, id_lawsystem)
+    else:
+        yield bloqueante(diario.falhar, id_lawsystem, "Falha ao criar tarefa")
+    return sucesso
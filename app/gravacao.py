@@ -0,0 +1,141 @@
+'''
+Gravação em lote (write-behind) do retorno das tarefas criadas no banco.
+
+Os ID_LAWSYSTEM das tarefas criadas são enfileirados e gravados em um único
+UPDATE por lote, usando uma conexão de longa duração, a cada N itens ou a cada
+T segundos, e obrigatoriamente no encerramento.
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+import threading
+from logs import log_step, numero_env
+from metricas import medir_fase
+
+# O SQL Server aceita no máximo 2100 parâmetros por comando
+LIMITE_PARAMETROS = 2000
+
+def criar_tabela_ids(nome):
+    """
+    SQL que cria a tabela temporária `nome`, com a coluna ID_LAWSYSTEM do mesmo
+    tipo de dbo.RECORTES, para receber um OUTPUT ... INTO: o SQL Server não
+    aceita OUTPUT sem INTO em tabelas com triggers habilitadas. O UNION ALL
+    impede que a coluna herde uma eventual propriedade IDENTITY.
+    """
+    return f"""
+    SET NOCOUNT ON;
+    IF OBJECT_ID('tempdb..{nome}') IS NOT NULL DROP TABLE {nome};
+    SELECT TOP 0 ID_LAWSYSTEM INTO {nome} FROM dbo.RECORTES
+    UNION ALL SELECT TOP 0 ID_LAWSYSTEM FROM dbo.RECORTES;
+"""
+
+class FilaGravacao:
+    '''Fila de IDs pendentes de atualização em dbo.RECORTES.'''
+
+    def __init__(self, conectar, tamanho_lote=None, intervalo=None):
+        self._conectar = conectar
+        self._conn = None
+        self.tamanho_lote = min(tamanho_lote or numero_env("AUTOTASK_LOTE_GRAVACAO", 50, minimo=1), LIMITE_PARAMETROS)
+        self.intervalo = intervalo or numero_env("AUTOTASK_INTERVALO_GRAVACAO_S", 10, float)
+        self._pendentes = []
+        self._lock = threading.Lock()
+        self._lock_conexao = threading.Lock()
+        self._sinal = threading.Event()
+        self._encerrar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="gravacao", daemon=True)
+        self._thread.start()
+
+    def adicionar(self, id_lawsystem):
+        '''Enfileira um ID para gravação; dispara o flush ao atingir o tamanho do lote.'''
+        with self._lock:
+            self._pendentes.append(id_lawsystem)
+            if len(self._pendentes) >= self.tamanho_lote:
+                self._sinal.set()
+
+    def _executar(self):
+        while not self._encerrar.is_set():
+            self._sinal.wait(self.intervalo)
+            self._sinal.clear()
+            self.flush()
+
+    def _conexao(self):
+        if self._conn is None:
+            self._conn = self._conectar()
+        return self._conn
+
+    def _descartar_conexao(self):
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def pendentes(self):
+        '''IDs enfileirados que ainda não foram gravados no banco.'''
+        with self._lock:
+            return set(self._pendentes)
+
+    def flush(self):
+        """
+        Grava todos os IDs pendentes, em lotes de no máximo tamanho_lote.
+        Retorna False se algum lote falhou e voltou para a fila.
+        """
+        with self._lock_conexao:
+            while True:
+                with self._lock:
+                    lote = self._pendentes[:self.tamanho_lote]
+                    del self._pendentes[:self.tamanho_lote]
+                if not lote:
+                    return True
+                if not self._gravar_lote(lote):
+                    # Devolve o lote para a próxima tentativa
+                    with self._lock:
+                        self._pendentes[:0] = lote
+                    return False
+
+    def _gravar_lote(self, lote):
+        import pymssql # pylint: disable=import-outside-toplevel
+        ids = list(dict.fromkeys(lote))
+        marcadores = ", ".join(["%s"] * len(ids))
+        query = criar_tabela_ids("#gravados") + f"""
+            UPDATE dbo.RECORTES SET IS_TAREFA=%s
+            OUTPUT inserted.ID_LAWSYSTEM INTO #gravados
+            WHERE ID_LAWSYSTEM IN ({marcadores});
+            SELECT ID_LAWSYSTEM FROM #gravados;
+            DROP TABLE #gravados;
+        """
+        try:
+            conn = self._conexao()
+            with medir_fase("gravacao_lote", itens=len(ids)):
+                cursor = conn.cursor()
+                cursor.execute(query, ("S", *ids))
+                atualizados = {linha[0] for linha in cursor.fetchall()}
+                conn.commit()
+        except pymssql.Error as e:
+            log_step(f"[ERRO] Erro ao atualizar {len(ids)} andamentos em lote: {e}")
+            self._descartar_conexao()
+            return False
+
+        for id_lawsystem in ids:
+            if id_lawsystem not in atualizados:
+                log_step(f"[ERRO] Nenhum registro foi atualizado para id andamento={id_lawsystem}.")
+        log_step(f"{len(atualizados)} andamentos atualizados no banco.")
+        return True
+
+    def encerrar(self):
+        """
+        Interrompe a thread de gravação, grava o que estiver pendente e fecha a
+        conexão. Retorna os IDs que não puderam ser gravados.
+        """
+        self._encerrar.set()
+        self._sinal.set()
+        self._thread.join()
+        self.flush()
+        with self._lock:
+            pendentes = list(self._pendentes)
+        for id_lawsystem in pendentes:
+            log_step(f"[ERRO] Andamento não gravado no banco: id andamento={id_lawsystem}")
+        with self._lock_conexao:
+            self._descartar_conexao()
+        return pendentes
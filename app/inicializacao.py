@@ -0,0 +1,59 @@
+'''
+Apoio à inicialização rápida: localização dos navegadores do Playwright em
+qualquer sistema operacional e medição do tempo de importação das dependências
+pesadas, que são carregadas apenas no primeiro uso.
+'''
+import importlib
+import os
+import sys
+import time
+from pathlib import Path
+from logs import log_step
+
+# Dependências pesadas importadas sob demanda pelo projeto
+MODULOS_PESADOS = ("pymssql", "playwright.sync_api", "pandas")
+
+INICIO_PROCESSO = time.perf_counter()
+
+def diretorio_navegadores():
+    """
+    Retorna o diretório onde o Playwright procura os navegadores, seguindo as
+    mesmas regras da biblioteca: PLAYWRIGHT_BROWSERS_PATH ou o cache padrão do
+    sistema operacional.
+    """
+    caminho = os.getenv("PLAYWRIGHT_BROWSERS_PATH")
+    if caminho and caminho != "0":
+        return Path(caminho)
+    if caminho == "0":
+        # Navegadores instalados dentro do próprio pacote do Playwright
+        import playwright # pylint: disable=import-outside-toplevel
+        return Path(playwright.__file__).parent / "driver" / "package" / ".local-browsers"
+    if sys.platform.startswith("win"):
+        return Path(os.getenv("LOCALAPPDATA", str(Path.home() / "AppData" / "Local"))) / "ms-playwright"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "ms-playwright"
+    return Path(os.getenv("XDG_CACHE_HOME", str(Path.home() / ".cache"))) / "ms-playwright"
+
+def navegadores_instalados():
+    '''Indica se há uma instalação do Chromium no diretório de navegadores do Playwright.'''
+    diretorio = diretorio_navegadores()
+    return diretorio.is_dir() and any(diretorio.glob("chromium*"))
+
+def reportar_tempos_importacao():
+    """
+    Com AUTOTASK_PERFIL_INICIALIZACAO=1, importa as dependências pesadas uma a
+    uma e registra quanto cada uma custou, além do tempo desde o início do processo.
+    """
+    if os.getenv("AUTOTASK_PERFIL_INICIALIZACAO") != "1":
+        return
+    log_step(f"Tempo até a inicialização: {(time.perf_counter() - INICIO_PROCESSO) * 1000:.0f} ms")
+    for modulo in MODULOS_PESADOS:
+        if modulo in sys.modules:
+            log_step(f"Importação de {modulo}: já carregado")
+            continue
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(modulo)
+            log_step(f"Importação de {modulo}: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        except ImportError as e:
+            log_step(f"[ERRO] Importação de {modulo} falhou: {e}")
@@ -0,0 +1,22 @@
+'''Funções de log compartilhadas entre os módulos do projeto.'''
+import logging
+import os
+
+def log_step(message):
+    ''' Exibe mensagens de log formatadas '''
+    print(f"[INFO] {message}")
+    logging.info(message)
+
+def numero_env(nome, padrao, tipo=int, minimo=None):
+    """
+    Lê um número da variável de ambiente `nome` convertido com `tipo`. Um valor
+    inválido é registrado no log e substituído por `padrão`, em vez de
+    interromper a automação; `minimo`, se informado, limita o resultado.
+    """
+    valor = os.getenv(nome, "").strip()
+    try:
+        numero = tipo(valor) if valor else tipo(padrao)
+    except ValueError:
+        log_step(f"[ERRO] Valor inválido em {nome}, utilizando {padrao}.")
+        numero = tipo(padrao)
+    return numero if minimo is None else max(minimo, numero)
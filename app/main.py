@@ -4,37 +4,56 @@
 
 import os
 import json
-from datetime import datetime, timedelta
-import time
-import logging
-from pathlib import Path
-import pymssql
-from playwright.sync_api import sync_playwright
-import pandas as pd
-
-def carregar_de_para(caminho_arquivo):
-    """
-    Carrega o arquivo Excel com a tabela de-para em um DataFrame.
-    """
-    return pd.read_excel(caminho_arquivo)
-
-def buscar_dados(df, pessoa_responsavel):
+import signal
+import asyncio
+import queue
+import threading
+from itertools import chain
+from logs import log_step, numero_env
+from inicializacao import navegadores_instalados, diretorio_navegadores, reportar_tempos_importacao
+from de_para import EXTENSAO_COMPILADA, carregar_de_para
+import fluxos
+import motor_async
+from gravacao import FilaGravacao
+from diario import Diario, diario_ativo
+from cache_autocomplete import CACHE_AUTOCOMPLETE, ESCRITORIO_ORIGEM, ESCRITORIO_RESPONSAVEL, TIPO, ENVOLVIDO, TIPO_PADRAO
+from reserva import Reserva, reserva_ativa
+from metricas import METRICAS, medir, medir_fase
+from navegador import FiltroRequisicoes, opcoes_lancamento, criar_contexto, reciclar_pagina, recriar_pagina
+from reciclagem import ControleReciclagem
+from planejamento import Planejamento
+from marca_dagua import ControleMarca, MODO_INCREMENTAL, modo_consulta
+from pipeline import FIM, iniciar_produtor, iterar_em_segundo_plano, tamanho_fila_padrao
+from passos import executar_passos, chamada_bloqueante
+from sessao import carregar_sessao
+from envio_http import (
+    MOTOR_HTTP, CAMPO_ID_ESCRITORIO_ORIGEM, CAMPO_ID_ESCRITORIO_RESPONSAVEL, CAMPO_ID_TIPO, CAMPO_ID_ENVOLVIDO,
+    obter_motor, ids_completos, enviar_tarefa_http,
+)
+
+def obter_ids_resolvidos(dados_depara, escritorio=None, envolvido=None):
     """
-    Busca os dados correspondentes ao Resposnável do Escritório no DataFrame.
+    Retorna os valores ocultos dos autocompletes usados pelo motor HTTP.
+    Os IDs de escritório e envolvido vêm das colunas opcionais do de-para e o
+    ID do tipo "Prazo Agendado" da variável LAWSYSTEM_ID_TIPO; na falta deles,
+    são usados os valores já resolvidos pelo navegador (cache de autocomplete).
     """
-    resultado = df[df['Responsável'] == pessoa_responsavel]
-    if resultado.empty:
-        return None  # Retorna None se não houver correspondência
-    return resultado.iloc[0].to_dict()
-
-def log_step(message):
-    ''' Exibe mensagens de log formatadas '''
-    print(f"[INFO] {message}")
-    logging.info(message)
+    def do_cache(campo, valor):
+        resolvido = CACHE_AUTOCOMPLETE.obter(campo, valor)
+        return resolvido[1] if resolvido else None
+
+    dados_depara = dados_depara or {}
+    id_escritorio = dados_depara.get('ID Escritório')
+    return {
+        CAMPO_ID_ESCRITORIO_ORIGEM: id_escritorio or do_cache(ESCRITORIO_ORIGEM, escritorio),
+        CAMPO_ID_ESCRITORIO_RESPONSAVEL: id_escritorio or do_cache(ESCRITORIO_RESPONSAVEL, escritorio),
+        CAMPO_ID_TIPO: os.getenv("LAWSYSTEM_ID_TIPO") or do_cache(TIPO, TIPO_PADRAO),
+        CAMPO_ID_ENVOLVIDO: dados_depara.get('ID Envolvido') or do_cache(ENVOLVIDO, envolvido),
+    }
 
 def configurar_playwright():
     """Garante que os navegadores do Playwright estão instalados."""
-    if not Path.home().joinpath("AppData", "Local", "ms-playwright").exists():
+    if not navegadores_instalados():
         log_step("Instalando navegadores do Playwright...")
         try:
             from playwright.__main__ import main as playwright_main # pylint: disable=import-outside-toplevel
@@ -46,12 +65,13 @@ def configurar_playwright():
             log_step(f"[ERRO] Falha ao instalar navegadores: {e}")
             raise
     else:
-        log_step("Navegadores do Playwright já estão instalados.")
+        log_step(f"Navegadores do Playwright já estão instalados em {diretorio_navegadores()}.")
 
 def get_curso_data_from_db():
     """
     Consulta o banco de dados SQL Server usando pymssql e retorna os resultados.
     """
+    import pymssql # pylint: disable=import-outside-toplevel
     server = os.getenv("SQL_SERVER")
     user = os.getenv("SQL_USER")
     password = os.getenv("SQL_PASSWORD")
@@ -64,17 +84,36 @@ def get_curso_data_from_db():
     except pymssql.Error as e:
         raise pymssql.Error(f"[ERRO] {e}")
 
-def fetch_data_from_db():
+PROJECAO_ENXUTA = "enxuta"
+PROJECAO_COMPLETA = "completa"
+
+# Codificação real do texto gravado em METADADOS
+CODIFICACAO_METADADOS = '850'
+
+def extrair_json(coluna, caminho):
     """
-    Consulta o banco de dados SQL Server usando pymssql e retorna os resultados.
+    Expressão SQL com o valor de `caminho` no JSON de `coluna`. METADADOS
+    malformado resulta em NULL em vez de interromper a consulta, e o valor volta
+    em bytes para ser decodificado em CODIFICACAO_METADADOS, como na projeção
+    completa (JSON_VALUE devolve NVARCHAR convertido pela collation da coluna).
     """
-    query = """
-    SELECT 
+    texto = f"CAST({coluna} as VARCHAR(MAX))"
+    return f"CAST(CAST(CASE WHEN ISJSON({texto}) = 1 THEN JSON_VALUE({texto}, '{caminho}') END AS VARCHAR(4000)) AS VARBINARY(4000))"
+
+# Projeção enxuta: extrai no servidor apenas os campos usados dos METADADOS (requer JSON_VALUE, SQL Server 2016+)
+COLUNAS_ENXUTAS = f"""
+        DATA_DIV, ID_LAWSYSTEM, PROCESSO,
+        {extrair_json("METADADOS", "$.idProcesso")} as ID_PROCESSO,
+        {extrair_json("METADADOS", "$.coordenacao")} as COORDENACAO
+"""
+
+COLUNAS_COMPLETAS = """
         CABECALHO, TEXTO, DATA_PUB, DATA_DIV, 
-        IS_TAREFA, ID_LAWSYSTEM, PROCESSO, CAST(METADADOS) AS VARBINARY(MAX)) as METADADOS
-    FROM 
-        dbo.RECORTES 
-    WHERE 
+        IS_TAREFA, ID_LAWSYSTEM, PROCESSO, CAST(METADADOS AS VARBINARY(MAX)) as METADADOS
+"""
+
+# Condição dos RECORTES que ainda precisam de tarefa
+FILTRO_PENDENTES = """
         BO_SINCRONIZADO = 'S' AND 
         NU_ESTADO = 2 AND 
         IS_TAREFA = 'N' AND
@@ -84,31 +123,177 @@ def fetch_data_from_db():
          AND UPPER(CAST(TEXTO as VARCHAR(MAX)))  not like '%O SISTEMA REGISTROU CIÊNCIA%'
          AND UPPER(CAST(TEXTO as VARCHAR(MAX)))  not like '%VOCÊ TOMOU CIÊNCIA EM%')) AND 
         DATA_DIV >= '2022-01-01 08:00:00.000'
+"""
+
+def montar_consulta(colunas, marca=None):
     """
+    Monta a consulta de RECORTES pendentes com as colunas informadas. Com `marca`
+    (DATA_DIV, ID_LAWSYSTEM) são lidos apenas os registros posteriores a ela.
+    """
+    query = f"""
+    SELECT {colunas}
+    FROM 
+        dbo.RECORTES 
+    WHERE {FILTRO_PENDENTES}"""
+    parametros = ()
+    if marca is not None:
+        # Com parâmetros, os '%' literais dos LIKE precisam ser escapados
+        # O DATA_DIV >= redundante permite ao otimizador usar uma busca por intervalo no índice
+        query = query.replace("%", "%%") + """ AND
+        DATA_DIV >= %s AND (DATA_DIV > %s OR (DATA_DIV = %s AND ID_LAWSYSTEM > %s))
+    """
+        parametros = (marca[0], marca[0], marca[0], marca[1])
+    # A ordenação garante que a marca d'água avance sem pular registros
+    query += " ORDER BY DATA_DIV, ID_LAWSYSTEM"
+    return query, parametros
+
+def decodificar_registro(row, projecao):
+    '''Corrige o encoding das colunas de METADADOS lidas em bytes.'''
+    colunas = ("METADADOS",) if projecao == PROJECAO_COMPLETA else ("ID_PROCESSO", "COORDENACAO")
+    for coluna in colunas:
+        if row.get(coluna) is not None:
+            row[coluna] = row[coluna].decode(CODIFICACAO_METADADOS)
+    return row
+
+def obter_projecao():
+    '''Retorna a projeção configurada em AUTOTASK_PROJECAO ("enxuta" ou "completa").'''
+    projecao = os.getenv("AUTOTASK_PROJECAO", PROJECAO_ENXUTA).strip().lower()
+    return PROJECAO_COMPLETA if projecao == PROJECAO_COMPLETA else PROJECAO_ENXUTA
+
+def iterar_dados_do_db(tamanho_bloco=None, marca=None):
+    """
+    Consulta o banco de dados SQL Server e devolve os registros sob demanda,
+    lendo o resultado em blocos com fetchmany e decodificando cada linha apenas
+    quando ela é consumida. Com `marca` (DATA_DIV, ID_LAWSYSTEM) são lidos apenas
+    os registros posteriores a ela.
+
+    Na projeção enxuta, se o servidor não suportar JSON_VALUE, a consulta é
+    refeita com o METADADOS completo.
+    """
+    import pymssql # pylint: disable=import-outside-toplevel
+    tamanho_bloco = tamanho_bloco or numero_env("AUTOTASK_TAMANHO_BLOCO", 500, minimo=1)
+    projecao = obter_projecao()
+    conn = None
+    total = 0
     try:
         conn = get_curso_data_from_db() # pylint: disable=no-member
         cursor = conn.cursor(as_dict=True)
-        cursor.execute(query)
-        results = cursor.fetchall()
-
-        # Corrigir encoding nos resultados
-        for row in results:
-            value = row['METADADOS']
-            row['METADADOS'] = value.decode('850')
+        if projecao == PROJECAO_ENXUTA:
+            try:
+                query, parametros = montar_consulta(COLUNAS_ENXUTAS, marca)
+                with medir_fase("consulta_db"):
+                    cursor.execute(query, parametros or None)
+            except pymssql.Error as e:
+                log_step(f"[ERRO] Projeção enxuta indisponível, utilizando METADADOS completo: {e}")
+                projecao = PROJECAO_COMPLETA
+                conn.close()
+                conn = get_curso_data_from_db() # pylint: disable=no-member
+                cursor = conn.cursor(as_dict=True)
+        if projecao == PROJECAO_COMPLETA:
+            query, parametros = montar_consulta(COLUNAS_COMPLETAS, marca)
+            with medir_fase("consulta_db"):
+                cursor.execute(query, parametros or None)
+
+        while True:
+            with medir_fase("consulta_db"):
+                bloco = cursor.fetchmany(tamanho_bloco)
+            if not bloco:
+                break
+            for row in bloco:
+                total += 1
+                yield decodificar_registro(row, projecao)
 
-        log_step(f"{len(results)} registros encontrados na consulta.")
-        return results
+        log_step(f"{total} registros lidos na consulta.")
     except pymssql.Error as e:
         log_step(f"[ERRO] Erro ao consultar o banco de dados: {e}")
-        return []
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+def iterar_reservas_do_db(reserva, marca=None):
+    """
+    Reserva lotes de registros em nome deste nó e os devolve sob demanda, até
+    não restar registro disponível. Cada lote só é reservado quando o anterior
+    já foi consumido. Com `marca` (DATA_DIV, ID_LAWSYSTEM), só são reservados
+    registros a partir da DATA_DIV da marca.
+    """
+    import pymssql # pylint: disable=import-outside-toplevel
+    projecao = obter_projecao()
+    conn = None
+    total = 0
+    try:
+        conn = get_curso_data_from_db() # pylint: disable=no-member
+        while True:
+            try:
+                with medir_fase("reserva_db"):
+                    lote = reserva.reservar(conn, COLUNAS_ENXUTAS if projecao == PROJECAO_ENXUTA else COLUNAS_COMPLETAS, FILTRO_PENDENTES, marca)
+            except pymssql.Error as e:
+                if projecao != PROJECAO_ENXUTA:
+                    raise
+                log_step(f"[ERRO] Projeção enxuta indisponível, utilizando METADADOS completo: {e}")
+                projecao = PROJECAO_COMPLETA
+                conn.close()
+                conn = get_curso_data_from_db() # pylint: disable=no-member
+                continue
+            if not lote:
+                break
+            for row in lote:
+                total += 1
+                yield decodificar_registro(row, projecao)
+
+        log_step(f"{total} registros reservados por {reserva.dono}.")
+    except pymssql.Error as e:
+        log_step(f"[ERRO] Erro ao reservar registros no banco de dados: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
+
+def liberar_reservas(reserva, manter=()):
+    '''Devolve as reservas deste nó que não resultaram em tarefa, exceto as de `manter`.'''
+    import pymssql # pylint: disable=import-outside-toplevel
+    conn = None
+    try:
+        conn = get_curso_data_from_db() # pylint: disable=no-member
+        reserva.liberar(conn, manter)
+    except pymssql.Error as e:
+        log_step(f"[ERRO] Erro ao devolver as reservas de {reserva.dono}: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
+
+def extrair_metadados(row):
+    """
+    Retorna (idProcesso, coordenacao) do registro, lidos das colunas extraídas
+    no servidor ou, na projeção completa, do JSON de METADADOS.
+    """
+    if "METADADOS" not in row:
+        if row.get("ID_PROCESSO") is None or row.get("COORDENACAO") is None:
+            raise ValueError(f"METADADOS sem idProcesso/coordenacao para id andamento={row['ID_LAWSYSTEM']}")
+        return row["ID_PROCESSO"], row["COORDENACAO"]
+    data = json.loads(row["METADADOS"])
+    return data['idProcesso'], data['coordenacao']
 
+# Fila de gravação em lote, ativa durante a execução de main()
+FILA_GRAVACAO = None
+
+# Diário local de trabalho, ativo durante a execução de main()
+DIARIO = None
+
+# Reserva de registros entre nós, ativa com AUTOTASK_RESERVA=1
+RESERVA = None
+
+@medir("gravacao_db")
 def set_data_from_db(id_lawsystem):
     """
     Atualiza a tabela de andamentos, indicando o sucesso da operação de
-    criação da tarefa.
+    criação da tarefa. Com a fila de gravação ativa, o ID é apenas enfileirado
+    e gravado no próximo lote.
     """
+    if FILA_GRAVACAO is not None:
+        FILA_GRAVACAO.adicionar(id_lawsystem)
+        return
+
+    import pymssql # pylint: disable=import-outside-toplevel
     query = """
         UPDATE dbo.RECORTES SET IS_TAREFA=%s 
         WHERE ID_LAWSYSTEM = %s
@@ -126,229 +311,397 @@ def set_data_from_db(id_lawsystem):
     finally:
         conn.close()
 
-def faz_login(logi_page):
+def faz_login(page):
     ''' Realiza o login e cria a sessão '''
+    return executar_passos(page, fluxos.faz_login())
+
+def garantir_sessao(page):
+    '''Reaproveita a sessão atual se ainda for válida; caso contrário refaz o login e salva a nova sessão.'''
+    return executar_passos(page, fluxos.garantir_sessao())
+
+def enviar_via_http(request, idadamento, idprocesso, escritorio, envolvido, dados_depara):
+    '''
+    Envia a tarefa pelo motor HTTP. Retorna None, sem enviar, quando faltam os
+    valores ocultos dos autocompletes (a tarefa segue pelo navegador).
+    '''
+    ids = obter_ids_resolvidos(dados_depara, escritorio, envolvido)
+    if not ids_completos(ids):
+        return None
+    return enviar_tarefa_http(request, idadamento, idprocesso, escritorio, envolvido, ids)
+
+def processar_linha(row, page, de_para):
+    '''Processa um único registro da consulta e cria a tarefa no LawSystem.'''
+    enviar_http = enviar_via_http if obter_motor() == MOTOR_HTTP else None
+    return executar_passos(page, fluxos.processar_linha(row, de_para, extrair_metadados, set_data_from_db, enviar_http))
+
+def executar_linha(row, page, de_para):
+    '''Processa o registro anotando a tentativa e o resultado no diário (ver fluxos.executar_com_diario).'''
+    tarefa = chamada_bloqueante(processar_linha, row, page, de_para)
+    return executar_passos(page, fluxos.executar_com_diario(row, DIARIO, tarefa))
+
+def restaurar_sessao(page, filtro=None, rotulo=None):
+    """
+    Garante a sessão após um erro. Se a página foi fechada ou o renderer travou,
+    recria antes o contexto a partir da sessão salva. Retorna (página em uso,
+    sessão válida).
+    """
     try:
-        # Obter credenciais do ambiente
-        username = os.getenv("LAWSYSTEM_USERNAME")
-        password = os.getenv("LAWSYSTEM_PASSWORD")
-        if not username or not password:
-            raise ValueError("Credenciais de login não encontradas nas variáveis de ambiente.")
-
-        # Acessando a página de login
-        logi_page.goto('https://example.com/login')
-
-        # Verificar se a página carregou e os campos estão disponíveis
-        logi_page.wait_for_load_state("networkidle", timeout=15000)
-        if not (logi_page.is_visible("input#Username") and logi_page.is_visible("input#Password")):
-            raise ValueError("Campos de login não encontrados.")
-
-        # Preenchendo os campos de login
-        logi_page.fill("input#Username", username)
-        logi_page.fill("input#Password", password)
-
-        # Clicando no botão de login
-        logi_page.click("button[type='submit']")
-
-        # Aguarde o carregamento da próxima página ou resposta
-        time.sleep(2)
-
-        # Verificar se o login falhou
-        if logi_page.is_visible("#form0 > div > div"):
-            error_message = logi_page.text_content("#form0 > div > div")
-            raise ValueError(f"Login não realizado: {error_message}")
-
-        # Verificar se o login foi realizado com sucesso
-        if not "firm.lawsystem.com.br" in logi_page.url:
-            raise ValueError("A página inicial não foi carregada corretamente.")
+        if not executar_passos(page, fluxos.pagina_utilizavel()):
+            page = recriar_pagina(page, filtro, rotulo)
+    except Exception as e:
+        log_step(f"[ERRO] Não foi possível recriar o contexto do navegador: {e}")
+        return page, False
+    return page, garantir_sessao(page)
 
-        # Login realizado com sucesso. Iniciando preenchimento de dados
-        return True
+def reciclar_se_preciso(page, reciclagem, filtro=None, rotulo=None):
+    """
+    Recicla a página ao cruzar os limites de uso. Uma página fechada ou travada,
+    ou uma reciclagem que falhou, é substituída por um contexto novo criado a
+    partir da sessão salva. Retorna a página em uso.
+    """
+    try:
+        if not executar_passos(page, fluxos.pagina_utilizavel()):
+            page = recriar_pagina(page, filtro, rotulo)
+        else:
+            motivo = executar_passos(page, reciclagem.verificar())
+            if not motivo:
+                return page
+            page = reciclar_pagina(page, filtro, f"{rotulo}, {motivo}" if rotulo else motivo)
+    except Exception as e:
+        log_step(f"[ERRO] Falha ao reciclar a página: {e}")
+        page = recriar_pagina(page, filtro, rotulo)
+    reciclagem.reiniciar()
+    return page
 
-    except ValueError as e:
-        log_step(f"[ERRO] {str(e)}")
-        return False
-    except Exception as e:  
-        log_step(f"[ERRO] Erro inesperado: {str(e)}")
-        return False
-
-def processar_resultados(results, page, de_para_df):
-    '''Processa os resultados da consulta ao banco e preenche os dados no LawSystem.'''
+def processar_resultados(results, page, de_para, parar=None, filtro=None, reciclagem=None):
+    """
+    Processa os resultados da consulta ao banco e preenche os dados no LawSystem.
+    Com `parar` sinalizado, encerra após a tarefa em andamento. A página é
+    reciclada ao cruzar os limites de uso; retorna a página em uso ao final.
+    """
+    reciclagem = reciclagem or ControleReciclagem()
     for row in results:
+        if parar is not None and parar.is_set():
+            log_step("Encerramento solicitado, interrompendo o processamento.")
+            break
         try:
-            # Extrai dados do banco
-            idadamento = row["ID_LAWSYSTEM"]
-            metadados = row["METADADOS"]
-            processo  = row["PROCESSO"]
-            data = json.loads(metadados)
-            idprocesso = data['idProcesso']
-
-            # Busca escritórios e envolvidos
-            envolvido  = 'Advogado Responsável'
-            escritorio = 'Escritório de Advocacia e Advogados Associados / Diretoria'
-            dados_depara = buscar_dados(de_para_df, data['coordenacao'])
-
-            if dados_depara:
-                envolvido = dados_depara.get('Envolvido', envolvido)
-                escritorio = dados_depara.get('Escritório', escritorio)
-            else:
-                log_step(f"[ERRO] Não foi possível encontrar dados de-para para {str(data['coordenacao'])}")
-
-            # Navega para a página de cadastro
-            if not navegar_para_pagina_cadastro(page, idadamento, idprocesso):
-                continue
-
-            # Preenche o formulário
-            preencher_formulario(page, escritorio, envolvido)
-
-            # Verifica se a página de erro foi carregada
-            if verificar_pagina_erro(page):
-                set_data_from_db(idadamento)
-                log_step(f"Tarefa criada com sucesso para o processo={processo}, coordenação={envolvido}, id andamento={idadamento}")
-            else:
-                log_step(f"[ERRO] Falha ao criar tarefa para id andamento={idadamento}")
-
+            executar_linha(row, page, de_para)
         except Exception as e:
             log_step(f"[ERRO] Erro inesperado: {e}")
-            if not faz_login(page):
+            page, sessao_ok = restaurar_sessao(page, filtro)
+            if not sessao_ok:
                 break
+        page = reciclar_se_preciso(page, reciclagem, filtro)
+    return page
+
+def obter_num_workers():
+    '''Retorna a quantidade de workers configurada em AUTOTASK_WORKERS (padrão 1).'''
+    return numero_env("AUTOTASK_WORKERS", 1, minimo=1)
+
+def executar_worker(numero, fila, storage_state, de_para, filtro):
+    '''
+    Consome registros da fila em um contexto isolado do navegador, reaproveitando
+    a sessão autenticada. Cada worker faz seu próprio re-login em caso de erro.
+    '''
+    from playwright.sync_api import sync_playwright # pylint: disable=import-outside-toplevel
+
+    # A API síncrona do Playwright não é thread-safe, então cada thread
+    # precisa da sua própria instância.
+    with sync_playwright() as p:
+        browser = p.chromium.launch(**opcoes_lancamento())
+        try:
+            context = criar_contexto(browser, storage_state, filtro)
+            page = context.new_page()
+            reciclagem = ControleReciclagem()
+            while True:
+                row = fila.get()
+                if row is FIM:
+                    break
+                try:
+                    executar_linha(row, page, de_para)
+                except Exception as e:
+                    log_step(f"[ERRO] [worker {numero}] Erro inesperado: {e}")
+                    page, sessao_ok = restaurar_sessao(page, filtro, f"worker {numero}")
+                    if not sessao_ok:
+                        log_step(f"[ERRO] [worker {numero}] Re-login falhou, encerrando worker.")
+                        break
+                page = reciclar_se_preciso(page, reciclagem, filtro, f"worker {numero}")
+        except Exception as e:
+            log_step(f"[ERRO] [worker {numero}] Erro inesperado: {e}")
+        finally:
+            browser.close()
+
+def processar_em_paralelo(results, storage_state, de_para, num_workers, filtro):
+    '''Distribui os registros entre workers concorrentes que compartilham a sessão autenticada.'''
+    # Com reserva, os workers não acumulam registros além dos que estão processando
+    fila = queue.Queue(maxsize=1 if RESERVA is not None else tamanho_fila_padrao())
+    cancelar = threading.Event()
+    iniciar_produtor(results, fila, cancelar, consumidores=num_workers)
+
+    log_step(f"Processando registros com {num_workers} workers.")
+    threads = [
+        threading.Thread(target=executar_worker, args=(numero, fila, storage_state, de_para, filtro), name=f"worker-{numero}")
+        for numero in range(1, num_workers + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Se todos os workers encerraram antes do fim, interrompe a leitura
+    cancelar.set()
+
+
+def descartar_registro(row, motivo):
+    '''Anota no diário um registro rejeitado no planejamento, para que não seja lido de novo.'''
+    if DIARIO is not None:
+        DIARIO.descartar(row["ID_LAWSYSTEM"], motivo)
+
+def preparar_registros(controle_marca, de_para):
+    """
+    Inicia a leitura dos registros em segundo plano, passando pela validação e
+    pelo planejamento. Retorna um iterável com os registros, ou None se a
+    consulta não retornou nada.
+    """
+    if RESERVA is not None:
+        # Um novo lote só é reservado quando o navegador esgota o anterior: sem
+        # leitura antecipada e com a janela do planejamento do tamanho do lote
+        registros = controle_marca.registrar_leitura(iterar_reservas_do_db(RESERVA, controle_marca.filtro()))
+        planejamento = Planejamento(extrair_metadados, de_para, descartar_registro, RESERVA.tamanho_lote)
+    else:
+        # Os registros são lidos do banco em segundo plano enquanto o navegador trabalha
+        registros = controle_marca.registrar_leitura(iterar_em_segundo_plano(iterar_dados_do_db(marca=controle_marca.filtro())))
+        planejamento = Planejamento(extrair_metadados, de_para, descartar_registro)
+    registros = planejamento.planejar(registros)
+    if DIARIO is not None and RESERVA is not None:
+        # Os pendentes do diário não estão reservados por este nó; voltam pela reserva quando estiverem disponíveis
+        DIARIO.nova_rodada()
+        registros = DIARIO.filtrar(registros, set_data_from_db)
+    elif DIARIO is not None:
+        # Retoma primeiro o que ficou pendente no diário e ignora descartados e falhas em espera
+        registros = chain(DIARIO.pendentes(), DIARIO.filtrar(registros, set_data_from_db))
+    # A marca d'água só avança sobre registros já entregues (e anotados no diário), nunca sobre os retidos no planejamento
+    registros = controle_marca.acompanhar(registros, planejamento.retidos)
+    primeiro = next(registros, None)
+    if primeiro is None:
+        return None
+    return chain([primeiro], registros)
+
+def caminho_de_para():
+    """
+    Retorna o caminho da planilha de-para distribuída com o projeto ou, no
+    build otimizado, da tabela já compilada.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    caminho = os.path.join(base_dir, 'resource', 'DE_PARA_ESCRITORIO_RESPONSAVEL.xlsx')
+    if os.path.exists(caminho):
+        return caminho
+    compilado = os.path.splitext(caminho)[0] + EXTENSAO_COMPILADA
+    if os.path.exists(compilado):
+        return compilado
+    raise FileNotFoundError(f"Arquivo de de-para não encontrado: {caminho}")
+
+def iniciar_execucao():
+    '''Abre a fila de gravação, o diário de trabalho e a reserva de registros da execução.'''
+    global FILA_GRAVACAO, DIARIO, RESERVA # pylint: disable=global-statement
+    METRICAS.iniciar()
+    FILA_GRAVACAO = FilaGravacao(get_curso_data_from_db)
+    if diario_ativo():
+        DIARIO = Diario()
+    if reserva_ativa():
+        RESERVA = Reserva()
+        RESERVA.iniciar_renovacao(get_curso_data_from_db)
+        log_step(f"Reservando registros como {RESERVA.dono}, em lotes de {RESERVA.tamanho_lote} por {RESERVA.duracao_s} s.")
+
+def finalizar_execucao(controle_marca):
+    '''Grava os pendentes no banco, a marca d'água e as métricas da execução.'''
+    global FILA_GRAVACAO, DIARIO, RESERVA # pylint: disable=global-statement
+    nao_gravados = ()
+    if FILA_GRAVACAO is not None:
+        nao_gravados = FILA_GRAVACAO.encerrar()
+        FILA_GRAVACAO = None
+    # Só depois da gravação, para devolver apenas o que não virou tarefa
+    if RESERVA is not None:
+        RESERVA.encerrar()
+        liberar_reservas(RESERVA, nao_gravados)
+        RESERVA = None
+    if DIARIO is not None:
+        DIARIO.fechar()
+        DIARIO = None
+    CACHE_AUTOCOMPLETE.salvar()
+    if controle_marca is not None:
+        controle_marca.salvar()
+    METRICAS.salvar_resumo()
+    METRICAS.fechar()
 
-
-def navegar_para_pagina_cadastro(page, idadamento, idprocesso):
-    '''Navega para a página de cadastro de tarefas.'''
+def main():
+    '''Inicia o processo.'''
+    controle_marca = None
     try:
-        page.goto(f'https://example.com/tarefas/createFromAndamento?idAnd={idadamento}&pId={idprocesso}', timeout=15000) 
-        return True
-    except Exception as e:  
-        log_step(f"[ERRO] Falha ao navegar para a página de cadastro: {e}")
-        return False
+        iniciar_execucao()
+        controle_marca = ControleMarca()
+        de_para = carregar_de_para(caminho_de_para())
+        results = preparar_registros(controle_marca, de_para)
+        if results is None:
+            log_step("Nenhum registro encontrado. Processo encerrado.")
+            return
 
+        from playwright.sync_api import sync_playwright # pylint: disable=import-outside-toplevel
+        with sync_playwright() as p:
+            browser = p.chromium.launch(**opcoes_lancamento())
+            filtro = FiltroRequisicoes()
+            context = criar_contexto(browser, carregar_sessao(), filtro)
+            page = context.new_page()
 
-def preencher_formulario(page, escritorio, envolvido):
-    '''Preenche o formulário no LawSystem.'''
-    try:
-        # Preenche o campo "SourceOfficeText"
-        page.fill("input#SourceOfficeText", escritorio)
-        page.keyboard.press("Enter")
-        time.sleep(1)
-        for _ in range(4):
-            page.keyboard.press("ArrowDown")
-            time.sleep(1)
-        page.keyboard.press("Enter")
-        time.sleep(1)
-
-        # Preenche o campo "ResponsibleOfficeText"
-        page.fill("input#ResponsibleOfficeText", escritorio)
-        page.keyboard.press("Enter")
-        time.sleep(1)
-        for _ in range(4):
-            page.keyboard.press("ArrowDown")
-            time.sleep(1)
-        page.keyboard.press("Enter")
-        time.sleep(1)
-
-        # Preenche o campo "Descricao"
-        page.fill("input#Descricao", "Conferir expediente no PJe")
-
-        # Preenche o campo "TipoText"
-        page.fill("input#TipoText", "Prazo Agendado")
-        page.keyboard.press("Enter")
-        time.sleep(1)
-        page.keyboard.press("ArrowDown")
-        time.sleep(1)
-        page.keyboard.press("Enter")
-        time.sleep(1)
-
-        # Preenche o campo "DtInicial" com a data atual
-        page.fill("input#DtInicial", datetime.now().strftime("%d/%m/%Y"))
-
-        # Preenche o campo "HrFinal" com um horário padrão
-        page.fill("input#HrFinal", "23:00:00")
-
-        # Preenche o campo "DtFinal" com a data de amanhã
-        page.fill("input#DtFinal", (datetime.now() + timedelta(days=1)).strftime("%d/%m/%Y"))
-
-        # Preenche o campo de envolvidos, navegando por 6 tabs no for
-        for _ in range(7):
-            page.keyboard.press("Tab")
-            time.sleep(0.5)
-        # Preencher o input onde o cursor parou
-        page.keyboard.type(envolvido)
-        page.keyboard.press("Enter")
-        time.sleep(1)
-        page.keyboard.press("ArrowDown")
-        time.sleep(1)
-        page.keyboard.press("Enter")
-        time.sleep(1)
-
-        # Clicar no botão "Excluir lembrete"
-        page.wait_for_selector('span[title="Remover lembrete"]')
-        page.click('span[title="Remover lembrete"]')
-
-        # Clicar no botão "Excluir lembrete"
-        page.wait_for_selector('span[title="Remover lembrete"]')
-        page.click('span[title="Remover lembrete"]')
-
-        # Clicar no checkbox para não manter os dados após salvar
-        page.click("input#Maintain")
-
-        # Clicar no botão "Salvar"
-        page.click('button[name="ButtonSave"][value="1"]')
-
-    except Exception as e:  
-        log_step(f"[ERRO] Erro ao preencher o formulário: {e}")
-
-
-def verificar_pagina_erro(page):
-    '''Verifica se a página de erro foi carregada.'''
-    try:
-        conteudo_pagina = page.text_content("body")
-        return "A página solicitada não foi encontrada." in conteudo_pagina
-    except Exception as e:
-        log_step(f"[ERRO] Erro ao verificar a página: {e}")
-        return False
+            try:
+                if not garantir_sessao(page):
+                    raise ValueError("Login não foi realizado")
 
+                num_workers = obter_num_workers()
+                if num_workers > 1:
+                    processar_em_paralelo(results, context.storage_state(), de_para, num_workers, filtro)
+                else:
+                    processar_resultados(results, page, de_para, filtro=filtro)
 
-def main():
-    '''Inicia o processo.'''
+            except ValueError as e:
+                log_step(f"[ERRO] {e}")
+            except Exception as e:
+                log_step(f"[ERRO] Erro inesperado: {e}")
+            finally:
+                filtro.relatorio()
+                browser.close()
+    except Exception as e:
+        log_step(f"[ERRO] Erro inesperado: {e}")
+    finally:
+        finalizar_execucao(controle_marca)
+        input("Pressione Enter para encerrar...")
+
+def main_async():
+    '''Inicia o processo usando o motor assíncrono (playwright.async_api).'''
+    controle_marca = None
     try:
-        results = fetch_data_from_db()
-        if not results:
+        iniciar_execucao()
+        controle_marca = ControleMarca()
+        de_para = carregar_de_para(caminho_de_para())
+        results = preparar_registros(controle_marca, de_para)
+        if results is None:
             log_step("Nenhum registro encontrado. Processo encerrado.")
             return
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)
-            page = browser.new_page()
+        asyncio.run(motor_async.executar(results, de_para, extrair_metadados, set_data_from_db, DIARIO))
+    except ValueError as e:
+        log_step(f"[ERRO] {e}")
+    except Exception as e:
+        log_step(f"[ERRO] Erro inesperado: {e}")
+    finally:
+        finalizar_execucao(controle_marca)
+        input("Pressione Enter para encerrar...")
 
+def obter_intervalos_servico():
+    """
+    Retorna (intervalo, intervalo máximo) entre consultas do modo serviço, em
+    segundos (AUTOTASK_INTERVALO_SERVICO_S e AUTOTASK_INTERVALO_MAXIMO_S).
+    """
+    intervalo = numero_env("AUTOTASK_INTERVALO_SERVICO_S", 5, float, minimo=0.5)
+    return intervalo, numero_env("AUTOTASK_INTERVALO_MAXIMO_S", 120, float, minimo=intervalo)
+
+def instalar_sinais(parar):
+    '''Sinaliza `parar` ao receber SIGTERM ou SIGINT, para um encerramento gracioso.'''
+    def tratar(numero, _frame):
+        log_step(f"Sinal {signal.Signals(numero).name} recebido, encerrando após a tarefa em andamento.")
+        parar.set()
+    for nome in ("SIGTERM", "SIGINT"):
+        if hasattr(signal, nome):
+            signal.signal(getattr(signal, nome), tratar)
+
+def main_servico():
+    """
+    Modo serviço: mantém o navegador e a sessão autenticada abertos e consulta
+    RECORTES periodicamente. Sem registros novos, o intervalo entre consultas
+    dobra até o máximo; ao encontrar registros, volta ao intervalo base.
+    """
+    # Sem a marca d'água, cada consulta repetiria a varredura completa de RECORTES
+    if modo_consulta() != MODO_INCREMENTAL:
+        log_step("[ERRO] O modo serviço requer AUTOTASK_MODO_CONSULTA=incremental. Serviço não iniciado.")
+        return
+    parar = threading.Event()
+    instalar_sinais(parar)
+    intervalo_base, intervalo_maximo = obter_intervalos_servico()
+    intervalo = intervalo_base
+    try:
+        iniciar_execucao()
+        de_para = carregar_de_para(caminho_de_para())
+        from playwright.sync_api import sync_playwright # pylint: disable=import-outside-toplevel
+        with sync_playwright() as p:
+            browser = p.chromium.launch(**opcoes_lancamento())
+            filtro = FiltroRequisicoes()
             try:
-                if not faz_login(page):
+                context = criar_contexto(browser, carregar_sessao(), filtro)
+                page = context.new_page()
+                if not garantir_sessao(page):
                     raise ValueError("Login não foi realizado")
 
-                base_dir = os.path.dirname(os.path.abspath(__file__))
-                caminho = os.path.join(base_dir, 'resource', 'DE_PARA_ESCRITORIO_RESPONSAVEL.xlsx')
-                if not os.path.exists(caminho):
-                    raise FileNotFoundError(f"Arquivo de de-para não encontrado: {caminho}")
-
-                de_para_df = carregar_de_para(caminho)
-                processar_resultados(results, page, de_para_df)
+                reciclagem = ControleReciclagem()
+                log_step(f"Modo serviço iniciado, consultando a cada {intervalo_base:g} s (máximo {intervalo_maximo:g} s).")
+                while not parar.is_set():
+                    controle_marca = ControleMarca()
+                    results = preparar_registros(controle_marca, de_para)
+                    if results is None:
+                        intervalo = min(intervalo * 2, intervalo_maximo)
+                    else:
+                        intervalo = intervalo_base
+                        page, sessao_ok = restaurar_sessao(page, filtro)
+                        if not sessao_ok:
+                            raise ValueError("Re-login falhou")
+                        page = processar_resultados(results, page, de_para, parar, filtro, reciclagem)
+                        # Grava o retorno antes da próxima consulta para não reler os mesmos registros
+                        if not FILA_GRAVACAO.flush():
+                            log_step("[ERRO] Retorno de tarefas não gravado no banco; as reservas desses registros continuam sendo renovadas.")
+                        CACHE_AUTOCOMPLETE.salvar()
+                        METRICAS.salvar_resumo()
+                    if RESERVA is not None:
+                        # Falhas desta rodada deixam de ser renovadas e voltam a ficar disponíveis ao
+                        # expirar; tarefas criadas com o retorno ainda na fila continuam reservadas
+                        RESERVA.encerrar_rodada(FILA_GRAVACAO.pendentes())
+                    controle_marca.salvar()
+                    parar.wait(intervalo)
 
             except ValueError as e:
                 log_step(f"[ERRO] {e}")
             except Exception as e:
                 log_step(f"[ERRO] Erro inesperado: {e}")
             finally:
+                filtro.relatorio()
                 browser.close()
     except Exception as e:
         log_step(f"[ERRO] Erro inesperado: {e}")
     finally:
-        input("Pressione Enter para encerrar...")
+        finalizar_execucao(None)
+        log_step("Modo serviço encerrado.")
+
+def testar_inicializacao():
+    """
+    Executa a inicialização até o ponto da primeira consulta ao banco (de-para
+    carregado e driver do banco importado) e encerra. Usado pelo benchmark de
+    inicialização do build.py.
+    """
+    import pymssql # pylint: disable=import-outside-toplevel,unused-import
+    carregar_de_para(caminho_de_para())
+    log_step("Inicialização concluída, pronto para a primeira consulta.")
 
 def init():
     '''Função principal de inicialização.'''
     # Configuração do Playwright antes de executar o programa
     configurar_playwright()
-    main()
+    reportar_tempos_importacao()
+    if os.getenv("AUTOTASK_TESTE_INICIALIZACAO") == "1":
+        testar_inicializacao()
+    elif os.getenv("AUTOTASK_SERVICO") == "1":
+        main_servico()
+    elif os.getenv("AUTOTASK_ASYNC") == "1":
+        main_async()
+    else:
+        main()
 
 if __name__ == "__main__":
     init()
@@ -0,0 +1,127 @@
+'''
+Modo incremental da consulta de RECORTES baseado em marca d'água.
+
+Guarda em um arquivo de estado local o maior (DATA_DIV, ID_LAWSYSTEM) já
+processado para que as próximas execuções consultem apenas os registros mais
+novos. Periodicamente é feita uma reconciliação completa para recuperar
+registros que ficaram para trás (falhas, registros sincronizados com atraso).
+'''
+# pylint: disable=broad-exception-caught
+
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from estado import caminho_estado
+from logs import log_step, numero_env
+
+ARQUIVO_MARCA = "marca_dagua.json"
+MODO_COMPLETO = "completo"
+MODO_INCREMENTAL = "incremental"
+
+def modo_consulta():
+    '''Modo da consulta configurado em AUTOTASK_MODO_CONSULTA ("completo" ou "incremental").'''
+    return os.getenv("AUTOTASK_MODO_CONSULTA", MODO_COMPLETO).strip().lower()
+
+class ControleMarca:
+    '''Controla a leitura, o avanço e a gravação da marca d'água da consulta.'''
+
+    def __init__(self):
+        self.modo = modo_consulta()
+        self.intervalo_reconciliacao = timedelta(hours=numero_env("AUTOTASK_RECONCILIACAO_HORAS", 24, float, minimo=0.0))
+        self.data_div = None
+        self.id_lawsystem = None
+        self.ultima_reconciliacao = None
+        self._alterada = False
+        self._consulta_concluida = False
+        # Chaves lidas do banco cujo registro ainda pode estar em processamento
+        self._lidos = []
+        self._carregar()
+        self.reconciliacao = self.modo == MODO_INCREMENTAL and self._reconciliacao_vencida()
+        if self.reconciliacao:
+            log_step("Executando reconciliação completa da consulta incremental.")
+
+    def _carregar(self):
+        caminho = caminho_estado(ARQUIVO_MARCA)
+        if not caminho.exists():
+            return
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                dados = json.load(arquivo)
+            if dados.get("DATA_DIV"):
+                self.data_div = datetime.fromisoformat(dados["DATA_DIV"])
+                self.id_lawsystem = dados.get("ID_LAWSYSTEM")
+            if dados.get("ultima_reconciliacao"):
+                self.ultima_reconciliacao = datetime.fromisoformat(dados["ultima_reconciliacao"])
+        except (OSError, ValueError) as e:
+            log_step(f"[ERRO] Marca d'água inválida, será feita uma consulta completa: {e}")
+
+    def _reconciliacao_vencida(self):
+        if self.data_div is None or self.ultima_reconciliacao is None:
+            return True
+        return datetime.now() - self.ultima_reconciliacao >= self.intervalo_reconciliacao
+
+    def filtro(self):
+        """
+        Retorna o (DATA_DIV, ID_LAWSYSTEM) a partir do qual a consulta deve ler,
+        ou None quando a consulta deve ser completa.
+        """
+        if self.modo != MODO_INCREMENTAL or self.reconciliacao:
+            return None
+        return (self.data_div, self.id_lawsystem)
+
+    def registrar_leitura(self, registros):
+        '''Repassa os registros lidos do banco, guardando suas chaves até serem liberados.'''
+        for row in registros:
+            heapq.heappush(self._lidos, (row["DATA_DIV"], row["ID_LAWSYSTEM"]))
+            yield row
+
+    def _avancar(self, limite=None):
+        '''Avança a marca d'água sobre as chaves lidas menores que `limite` (todas, sem limite).'''
+        while self._lidos and (limite is None or self._lidos[0] < limite):
+            chave = heapq.heappop(self._lidos)
+            if self.data_div is None or chave > (self.data_div, self.id_lawsystem):
+                self.data_div, self.id_lawsystem = chave
+                self._alterada = True
+
+    def acompanhar(self, registros, retidos=None):
+        """
+        Repassa os registros ao navegador, ao final do encadeamento (depois do
+        planejamento e do diário). A marca d'água só avança até antes da menor
+        chave ainda em processamento, dada por `retidos()`: registros que o
+        planejamento guarda, incluindo o que está sendo entregue. Um registro
+        conta como liberado quando o próximo é pedido; com o diário ativo ele já
+        foi anotado como pendente antes de chegar aqui.
+        """
+        for row in registros:
+            chaves = list(retidos()) if retidos is not None else []
+            self._avancar(min(chaves) if chaves else None)
+            yield row
+        self._avancar()
+        self._consulta_concluida = True
+
+    def salvar(self):
+        """
+        Grava a marca d'água. A reconciliação só é registrada se a consulta foi
+        lida até o fim.
+        """
+        if self.modo != MODO_INCREMENTAL:
+            return
+        if self.reconciliacao and self._consulta_concluida:
+            self.ultima_reconciliacao = datetime.now()
+            self._alterada = True
+        if not self._alterada:
+            return
+        dados = {
+            "DATA_DIV": self.data_div.isoformat() if self.data_div else None,
+            "ID_LAWSYSTEM": self.id_lawsystem,
+            "ultima_reconciliacao": self.ultima_reconciliacao.isoformat() if self.ultima_reconciliacao else None,
+        }
+        try:
+            caminho = caminho_estado(ARQUIVO_MARCA)
+            temporario = caminho.with_suffix(".tmp")
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(dados, arquivo)
+            os.replace(temporario, caminho)
+        except Exception as e:
+            log_step(f"[ERRO] Não foi possível salvar a marca d'água: {e}")
@@ -0,0 +1,245 @@
+'''
+Medição de tempo por fase da execução e métricas para monitoramento.
+
+Cada fase medida (consulta ao banco, login, navegação, preenchimento, verificação,
+gravação) gera um evento JSON em eventos.jsonl e alimenta um histograma em
+memória. O arquivo de eventos é rotacionado ao atingir AUTOTASK_EVENTOS_MAX_MB,
+mantendo as cópias eventos.jsonl.1 a eventos.jsonl.3. Ao final da execução é
+gravado um resumo com p50/p95/máximo por fase, tarefas por hora e falhas por
+fase, em JSON e no formato texto do Prometheus.
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from estado import caminho_estado
+from logs import log_step, numero_env
+
+# Limites dos baldes do histograma, em segundos: de 1 ms a ~30 min, crescendo 25% a cada balde
+FATOR_BALDE = 1.25
+MENOR_BALDE = 0.001
+QUANTIDADE_BALDES = 65
+
+FASE_TAREFA = "tarefa"
+
+ARQUIVO_EVENTOS = "eventos.jsonl"
+# Cópias rotacionadas mantidas além do arquivo atual
+COPIAS_EVENTOS = 3
+# Intervalo máximo, em segundos, para os eventos escritos chegarem ao disco
+INTERVALO_FLUSH_EVENTOS_S = 5.0
+
+class Histograma:
+    '''Histograma de durações com baldes exponenciais, de custo constante por amostra.'''
+
+    def __init__(self):
+        self.baldes = [0] * (QUANTIDADE_BALDES + 1)
+        self.quantidade = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+        self.falhas = 0
+
+    @staticmethod
+    def limite(indice):
+        '''Limite superior do balde, em segundos.'''
+        return MENOR_BALDE * FATOR_BALDE ** indice
+
+    def adicionar(self, duracao, sucesso=True):
+        if duracao <= MENOR_BALDE:
+            indice = 0
+        else:
+            indice = min(QUANTIDADE_BALDES, math.ceil(math.log(duracao / MENOR_BALDE, FATOR_BALDE)))
+        self.baldes[indice] += 1
+        self.quantidade += 1
+        self.soma += duracao
+        self.maximo = max(self.maximo, duracao)
+        if not sucesso:
+            self.falhas += 1
+
+    def percentil(self, p):
+        '''Percentil aproximado pelo limite superior do balde (erro máximo de 25%).'''
+        if not self.quantidade:
+            return 0.0
+        alvo = math.ceil(self.quantidade * p / 100)
+        acumulado = 0
+        for indice, contagem in enumerate(self.baldes):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return min(self.limite(indice), self.maximo)
+        return self.maximo
+
+class Metricas:
+    '''Registro das fases medidas durante uma execução.'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._arquivo_eventos = None
+        self._eventos_ativos = os.getenv("AUTOTASK_EVENTOS", "1") != "0"
+        self._limite_eventos = int(numero_env("AUTOTASK_EVENTOS_MAX_MB", 50, float) * 1024 * 1024)
+        self._tamanho_eventos = 0
+        self._ultimo_flush = time.monotonic()
+        self.inicio = time.time()
+        self.fases = {}
+
+    def iniciar(self):
+        '''Zera os histogramas para uma nova execução.'''
+        with self._lock:
+            self.inicio = time.time()
+            self.fases = {}
+
+    def _abrir_eventos(self):
+        try:
+            self._arquivo_eventos = open(caminho_estado(ARQUIVO_EVENTOS), "a", encoding="utf-8") # pylint: disable=consider-using-with
+            self._tamanho_eventos = self._arquivo_eventos.tell()
+        except OSError as e:
+            self._eventos_ativos = False
+            log_step(f"[ERRO] Não foi possível abrir o arquivo de eventos: {e}")
+
+    def _fechar_eventos(self):
+        if self._arquivo_eventos is not None:
+            self._arquivo_eventos.close()
+            self._arquivo_eventos = None
+
+    def _rotacionar_eventos(self):
+        '''Renomeia eventos.jsonl para eventos.jsonl.1 (e as cópias anteriores adiante) e abre um arquivo novo.'''
+        self._fechar_eventos()
+        caminho = str(caminho_estado(ARQUIVO_EVENTOS))
+        try:
+            for indice in range(COPIAS_EVENTOS - 1, 0, -1):
+                if os.path.exists(f"{caminho}.{indice}"):
+                    os.replace(f"{caminho}.{indice}", f"{caminho}.{indice + 1}")
+            os.replace(caminho, f"{caminho}.1")
+        except OSError as e:
+            log_step(f"[ERRO] Não foi possível rotacionar o arquivo de eventos: {e}")
+        self._abrir_eventos()
+
+    def _emitir_evento(self, evento):
+        # O arquivo é aberto apenas no primeiro evento, para não criar arquivos na importação
+        if self._arquivo_eventos is None and self._eventos_ativos:
+            self._abrir_eventos()
+        if self._arquivo_eventos is None:
+            return
+        linha = json.dumps(evento, default=str) + "\n"
+        self._arquivo_eventos.write(linha)
+        self._tamanho_eventos += len(linha.encode("utf-8"))
+        if self._limite_eventos > 0 and self._tamanho_eventos >= self._limite_eventos:
+            self._rotacionar_eventos()
+        elif time.monotonic() - self._ultimo_flush >= INTERVALO_FLUSH_EVENTOS_S:
+            self._arquivo_eventos.flush()
+            self._ultimo_flush = time.monotonic()
+
+    def registrar(self, fase, duracao, sucesso=True, **dados):
+        '''Registra uma amostra da fase e emite o evento JSON correspondente.'''
+        with self._lock:
+            self.fases.setdefault(fase, Histograma()).adicionar(duracao, sucesso)
+            self._emitir_evento({"ts": round(time.time(), 3), "fase": fase, "duracao_ms": round(duracao * 1000, 1), "sucesso": sucesso, "thread": threading.current_thread().name, **dados})
+
+    def resumo(self):
+        '''Monta o resumo da execução por fase.'''
+        with self._lock:
+            duracao = time.time() - self.inicio
+            tarefas = self.fases.get(FASE_TAREFA)
+            concluidas = tarefas.quantidade - tarefas.falhas if tarefas else 0
+            return {
+                "inicio": datetime.fromtimestamp(self.inicio).isoformat(),
+                "duracao_s": round(duracao, 1),
+                "tarefas_concluidas": concluidas,
+                "tarefas_por_hora": round(concluidas / duracao * 3600, 1) if duracao else 0.0,
+                "fases": {
+                    fase: {
+                        "quantidade": h.quantidade,
+                        "falhas": h.falhas,
+                        "p50_ms": round(h.percentil(50) * 1000, 1),
+                        "p95_ms": round(h.percentil(95) * 1000, 1),
+                        "max_ms": round(h.maximo * 1000, 1),
+                        "total_s": round(h.soma, 1),
+                    }
+                    for fase, h in self.fases.items()
+                },
+            }
+
+    def salvar_resumo(self):
+        '''Grava o resumo em metricas.json e metricas.prom (coletor textfile do Prometheus).'''
+        resumo = self.resumo()
+        caminho = os.getenv("AUTOTASK_ARQUIVO_METRICAS") or str(caminho_estado("metricas.json"))
+        linhas = [
+            f"autotask_duracao_execucao_segundos {resumo['duracao_s']}",
+            f"autotask_tarefas_concluidas {resumo['tarefas_concluidas']}",
+            f"autotask_tarefas_por_hora {resumo['tarefas_por_hora']}",
+        ]
+        for fase, dados in resumo["fases"].items():
+            for quantil, chave in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("1", "max_ms")):
+                linhas.append(f'autotask_fase_segundos{{fase="{fase}",quantile="{quantil}"}} {dados[chave] / 1000}')
+            linhas.append(f'autotask_fase_total{{fase="{fase}"}} {dados["quantidade"]}')
+            linhas.append(f'autotask_fase_falhas_total{{fase="{fase}"}} {dados["falhas"]}')
+        try:
+            with open(caminho, "w", encoding="utf-8") as arquivo:
+                json.dump(resumo, arquivo, indent=2)
+            with open(os.path.splitext(caminho)[0] + ".prom", "w", encoding="utf-8") as arquivo:
+                arquivo.write("\n".join(linhas) + "\n")
+        except OSError as e:
+            log_step(f"[ERRO] Não foi possível gravar as métricas: {e}")
+        with self._lock:
+            if self._arquivo_eventos is not None:
+                self._arquivo_eventos.flush()
+        for fase, dados in resumo["fases"].items():
+            log_step(f"Fase {fase}: {dados['quantidade']} execuções, {dados['falhas']} falhas, p50 {dados['p50_ms']:.0f} ms, p95 {dados['p95_ms']:.0f} ms, máx {dados['max_ms']:.0f} ms")
+        log_step(f"{resumo['tarefas_concluidas']} tarefas concluídas ({resumo['tarefas_por_hora']:.0f}/hora).")
+
+    def fechar(self):
+        '''Fecha o arquivo de eventos; um novo evento volta a abri-lo.'''
+        with self._lock:
+            self._fechar_eventos()
+
+METRICAS = Metricas()
+
+@contextmanager
+def medir_fase(fase, **dados):
+    '''Mede o bloco como uma amostra da fase; exceções contam como falha.'''
+    inicio = time.perf_counter()
+    sucesso = True
+    try:
+        yield
+    except BaseException:
+        sucesso = False
+        raise
+    finally:
+        METRICAS.registrar(fase, time.perf_counter() - inicio, sucesso, **dados)
+
+def medir(fase):
+    '''Decorador que mede cada chamada como uma amostra da fase; retorno False conta como falha.'''
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            inicio = time.perf_counter()
+            sucesso = False
+            try:
+                resultado = funcao(*args, **kwargs)
+                sucesso = resultado is not False
+                return resultado
+            finally:
+                METRICAS.registrar(fase, time.perf_counter() - inicio, sucesso)
+        return envoltorio
+    return decorador
+
+def medir_passos(fase):
+    '''Versão de `medir` para passos (geradores de passos.py), medindo do primeiro ao último passo.'''
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            inicio = time.perf_counter()
+            sucesso = False
+            try:
+                resultado = yield from funcao(*args, **kwargs)
+                sucesso = resultado is not False
+                return resultado
+            finally:
+                METRICAS.registrar(fase, time.perf_counter() - inicio, sucesso)
+        return envoltorio
+    return decorador
@@ -0,0 +1,173 @@
+'''
+Motor assíncrono baseado em playwright.async_api.
+
+Um único navegador e um único contexto autenticado atendem várias páginas no
+mesmo event loop. Um semáforo limita quantas tarefas ficam em andamento ao
+mesmo tempo (AUTOTASK_CONCORRENCIA) e as chamadas bloqueantes ao banco
+(leitura dos registros e gravação do retorno) rodam em um executor de threads
+limitado, sem travar o navegador.
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from logs import log_step, numero_env
+import fluxos
+from navegador import FiltroRequisicoes, opcoes_lancamento
+from passos import executar_passos_async
+from reciclagem import ControleReciclagem
+from sessao import carregar_sessao
+
+def obter_concorrencia():
+    '''Quantidade máxima de tarefas em andamento no motor assíncrono (AUTOTASK_CONCORRENCIA, padrão 4).'''
+    return numero_env("AUTOTASK_CONCORRENCIA", 4, minimo=1)
+
+class MotorAsync:
+    '''Processa os registros em várias páginas de um mesmo contexto autenticado.'''
+
+    def __init__(self, de_para, extrair_metadados, set_data_from_db, concorrencia=None, diario=None):
+        self.de_para = de_para
+        self.extrair_metadados = extrair_metadados
+        self.set_data_from_db = set_data_from_db
+        self.diario = diario
+        self.concorrencia = concorrencia or obter_concorrencia()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="db")
+        self.semaforo = asyncio.Semaphore(self.concorrencia)
+        self.paginas = asyncio.Queue()
+        self.lock_login = asyncio.Lock()
+        self.lock_contexto = asyncio.Lock()
+        self.contexto = None
+        self.filtro = None
+        self.sessao_perdida = False
+        self.reciclagem = {}
+
+    async def em_thread(self, funcao, *args):
+        '''Executa uma chamada bloqueante (banco de dados) no executor limitado.'''
+        return await asyncio.get_running_loop().run_in_executor(self.executor, funcao, *args)
+
+    async def executar(self, page, passos):
+        '''Executa passos compartilhados (ver passos.py) na página.'''
+        return await executar_passos_async(page, passos, self.em_thread)
+
+    async def garantir_sessao(self, page):
+        '''Refaz o login uma única vez mesmo que várias páginas falhem ao mesmo tempo.'''
+        async with self.lock_login:
+            return await self.executar(page, fluxos.garantir_sessao())
+
+    async def _executar_linha(self, row, page):
+        '''Processa o registro anotando a tentativa e o resultado no diário.'''
+        tarefa = fluxos.processar_linha(row, self.de_para, self.extrair_metadados, self.set_data_from_db)
+        return await self.executar(page, fluxos.executar_com_diario(row, self.diario, tarefa))
+
+    async def _recriar_pagina(self, page):
+        """
+        Substitui uma página fechada ou travada por uma nova no contexto
+        compartilhado. Se o próprio contexto caiu, recria-o a partir da sessão
+        salva; as demais páginas passam a usar o novo contexto ao serem recriadas.
+        """
+        self.reciclagem.pop(page, None)
+        try:
+            await page.close()
+        except Exception:
+            pass
+        async with self.lock_contexto:
+            try:
+                return await self.contexto.new_page()
+            except Exception as e:
+                log_step(f"[ERRO] Contexto do navegador indisponível, recriando a partir da sessão salva: {e}")
+                self.contexto = await self.contexto.browser.new_context(storage_state=carregar_sessao())
+                if self.filtro is not None:
+                    await self.filtro.instalar_async(self.contexto)
+                return await self.contexto.new_page()
+
+    async def _reciclar_se_preciso(self, page):
+        """
+        Substitui a página por uma nova no mesmo contexto quando ela cruza os
+        limites de tarefas ou de memória. O contexto é compartilhado pelas
+        demais páginas, então a sessão continua válida. Uma página fechada ou
+        travada, ou uma reciclagem que falhou, é recriada (ver _recriar_pagina).
+        """
+        try:
+            if not await self.executar(page, fluxos.pagina_utilizavel()):
+                return await self._recriar_pagina(page)
+            controle = self.reciclagem.setdefault(page, ControleReciclagem())
+            motivo = await self.executar(page, controle.verificar())
+            if not motivo:
+                return page
+            nova = await self.contexto.new_page()
+            await page.close()
+            del self.reciclagem[page]
+            log_step(f"Reciclando página do motor assíncrono ({motivo}).")
+            return nova
+        except Exception as e:
+            log_step(f"[ERRO] Falha ao reciclar a página: {e}")
+        try:
+            return await self._recriar_pagina(page)
+        except Exception as e:
+            log_step(f"[ERRO] Não foi possível recriar a página: {e}")
+            self.sessao_perdida = True
+            return page
+
+    async def _executar_tarefa(self, row):
+        page = await self.paginas.get()
+        try:
+            await self._executar_linha(row, page)
+        except Exception as e:
+            log_step(f"[ERRO] Erro inesperado: {e}")
+            try:
+                if not await self.executar(page, fluxos.pagina_utilizavel()):
+                    page = await self._recriar_pagina(page)
+                if not await self.garantir_sessao(page):
+                    self.sessao_perdida = True
+            except Exception as e_recriar:
+                log_step(f"[ERRO] Não foi possível recriar a página: {e_recriar}")
+                self.sessao_perdida = True
+        finally:
+            page = await self._reciclar_se_preciso(page)
+            self.paginas.put_nowait(page)
+            self.semaforo.release()
+
+    async def processar(self, registros, context, filtro=None):
+        '''Consome os registros, mantendo no máximo `concorrencia` tarefas em andamento.'''
+        self.contexto = context
+        self.filtro = filtro
+        for _ in range(self.concorrencia):
+            self.paginas.put_nowait(await context.new_page())
+
+        iterador = iter(registros)
+        tarefas = set()
+        while not self.sessao_perdida:
+            # A leitura do próximo registro pode bloquear na fila do banco
+            row = await self.em_thread(next, iterador, None)
+            if row is None:
+                break
+            await self.semaforo.acquire()
+            tarefa = asyncio.create_task(self._executar_tarefa(row))
+            tarefas.add(tarefa)
+            tarefa.add_done_callback(tarefas.discard)
+        if self.sessao_perdida:
+            log_step("[ERRO] Re-login falhou, encerrando o motor assíncrono.")
+        await asyncio.gather(*tarefas)
+
+async def executar(registros, de_para, extrair_metadados, set_data_from_db, diario=None):
+    '''Abre o navegador, garante a sessão e processa os registros no motor assíncrono.'''
+    from playwright.async_api import async_playwright # pylint: disable=import-outside-toplevel
+
+    motor = MotorAsync(de_para, extrair_metadados, set_data_from_db, diario=diario)
+    log_step(f"Processando registros no motor assíncrono com concorrência {motor.concorrencia}.")
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(**opcoes_lancamento())
+        filtro = FiltroRequisicoes()
+        try:
+            context = await browser.new_context(storage_state=carregar_sessao())
+            await filtro.instalar_async(context)
+            page = await context.new_page()
+            if not await motor.garantir_sessao(page):
+                raise ValueError("Login não foi realizado")
+            await page.close()
+            await motor.processar(registros, context, filtro)
+        finally:
+            filtro.relatorio()
+            await browser.close()
+            motor.executor.shutdown(wait=True)
@@ -0,0 +1,137 @@
+'''
+Perfil enxuto do navegador usado pelos workers.
+
+Define as opções de lançamento (headless por padrão) e uma camada de
+interceptação de requisições que bloqueia tipos de recurso e padrões de URL
+configuráveis (imagens, fontes, analytics), mantendo o JavaScript que o
+formulário precisa. Contadores por tipo de recurso permitem medir a economia
+de banda de cada execução.
+'''
+# pylint: disable=broad-exception-caught
+
+import fnmatch
+import os
+import threading
+from collections import defaultdict
+from logs import log_step
+from sessao import carregar_sessao
+
+TIPOS_BLOQUEADOS_PADRAO = "image,media,font"
+URLS_BLOQUEADAS_PADRAO = ",".join([
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*facebook.net*",
+    "*fonts.googleapis.com*",
+    "*fonts.gstatic.com*",
+])
+
+def _lista_env(nome, padrao):
+    return [item.strip() for item in os.getenv(nome, padrao).split(",") if item.strip()]
+
+def opcoes_lancamento():
+    '''Opções para chromium.launch; AUTOTASK_HEADLESS=0 exibe o navegador.'''
+    return {"headless": os.getenv("AUTOTASK_HEADLESS", "1") != "0"}
+
+class FiltroRequisicoes:
+    '''Bloqueia recursos desnecessários e contabiliza requisições e bytes por tipo.'''
+
+    def __init__(self):
+        self.tipos_bloqueados = set(_lista_env("AUTOTASK_BLOQUEAR_TIPOS", TIPOS_BLOQUEADOS_PADRAO))
+        self.urls_bloqueadas = _lista_env("AUTOTASK_BLOQUEAR_URLS", URLS_BLOQUEADAS_PADRAO)
+        self._lock = threading.Lock()
+        self.bloqueadas = defaultdict(int)
+        self.permitidas = defaultdict(int)
+        self.bytes_permitidos = defaultdict(int)
+
+    def bloquear(self, tipo, url):
+        '''Indica se a requisição deve ser bloqueada.'''
+        if tipo in self.tipos_bloqueados:
+            return True
+        return any(fnmatch.fnmatch(url, padrao) for padrao in self.urls_bloqueadas)
+
+    def _tratar_rota(self, route):
+        requisicao = route.request
+        if self.bloquear(requisicao.resource_type, requisicao.url):
+            with self._lock:
+                self.bloqueadas[requisicao.resource_type] += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    def _registrar_resposta(self, resposta):
+        try:
+            # Usa o cabeçalho para não gerar uma ida ao navegador por resposta
+            tamanho = int(resposta.headers.get("content-length", 0))
+        except ValueError:
+            tamanho = 0
+        tipo = resposta.request.resource_type
+        with self._lock:
+            self.permitidas[tipo] += 1
+            self.bytes_permitidos[tipo] += tamanho
+
+    def instalar(self, context):
+        '''Ativa o filtro e os contadores no contexto do navegador.'''
+        if self.tipos_bloqueados or self.urls_bloqueadas:
+            context.route("**/*", self._tratar_rota)
+        context.on("response", self._registrar_resposta)
+
+    async def _tratar_rota_async(self, route):
+        requisicao = route.request
+        if self.bloquear(requisicao.resource_type, requisicao.url):
+            with self._lock:
+                self.bloqueadas[requisicao.resource_type] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def instalar_async(self, context):
+        '''Versão de `instalar` para contextos de playwright.async_api.'''
+        if self.tipos_bloqueados or self.urls_bloqueadas:
+            await context.route("**/*", self._tratar_rota_async)
+        context.on("response", self._registrar_resposta)
+
+    def relatorio(self):
+        '''Registra no log os contadores de requisições bloqueadas e permitidas da execução.'''
+        with self._lock:
+            navegacoes = self.permitidas.get("document", 0)
+            total_bytes = sum(self.bytes_permitidos.values())
+            log_step(f"Requisições bloqueadas: {sum(self.bloqueadas.values())} {dict(self.bloqueadas)}")
+            log_step(f"Requisições permitidas: {sum(self.permitidas.values())}, {total_bytes / 1024:.0f} KiB {dict(self.bytes_permitidos)}")
+            if navegacoes:
+                log_step(f"Média por navegação: {total_bytes / navegacoes / 1024:.0f} KiB, {sum(self.bloqueadas.values()) / navegacoes:.1f} requisições bloqueadas")
+
+def criar_contexto(browser, storage_state=None, filtro=None):
+    '''Cria um contexto com a sessão informada e o filtro de requisições instalado.'''
+    context = browser.new_context(storage_state=storage_state)
+    if filtro is not None:
+        filtro.instalar(context)
+    return context
+
+def reciclar_pagina(page, filtro=None, motivo=None):
+    """
+    Fecha o contexto da página e abre um novo com a mesma sessão autenticada,
+    liberando a memória acumulada no renderer. Retorna a nova página.
+    """
+    context = page.context
+    browser = context.browser
+    storage_state = context.storage_state()
+    context.close()
+    log_step(f"Reciclando o contexto do navegador ({motivo or 'solicitado'}).")
+    return criar_contexto(browser, storage_state, filtro).new_page()
+
+def recriar_pagina(page, filtro=None, motivo=None):
+    """
+    Descarta o contexto de uma página fechada ou travada, sem ler nada dela, e
+    abre um novo a partir da sessão salva em disco. Retorna a nova página.
+    """
+    context = page.context
+    browser = context.browser
+    try:
+        context.close()
+    except Exception:
+        pass
+    log_step(f"Recriando o contexto do navegador a partir da sessão salva ({motivo or 'página indisponível'}).")
+    return criar_contexto(browser, carregar_sessao(), filtro).new_page()
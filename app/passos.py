@@ -0,0 +1,127 @@
+'''
+Passos da automação compartilhados pelos motores síncrono e assíncrono.
+
+Os fluxos (login, autocompletes, formulário, salvamento, diário) são escritos
+uma única vez como geradores: cada `yield` entrega uma operação sobre a página
+e recebe o seu resultado, ou a exceção lançada por ela. O motor síncrono
+executa as operações com executar_passos e o assíncrono com
+executar_passos_async, que apenas aguarda cada chamada.
+'''
+# pylint: disable=broad-exception-caught
+
+import inspect
+
+class Chamada:
+    '''Chamada a um método da página (ou de `alvo`); sem `args`, apenas lê o atributo.'''
+
+    __slots__ = ("caminho", "args", "kwargs", "alvo")
+
+    def __init__(self, caminho, args=None, kwargs=None, alvo=None):
+        self.caminho = caminho
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.alvo = alvo
+
+    def resolver(self, page):
+        '''Retorna o atributo apontado por `caminho` ("keyboard.press", "context.request.get"...).'''
+        objeto = page if self.alvo is None else self.alvo
+        for nome in filter(None, self.caminho.split(".")):
+            objeto = getattr(objeto, nome)
+        return objeto
+
+class Bloqueante:
+    '''Chamada bloqueante (banco de dados, diário), feita fora do event loop no motor assíncrono.'''
+
+    __slots__ = ("funcao", "args")
+
+    def __init__(self, funcao, args):
+        self.funcao = funcao
+        self.args = args
+
+class CliqueComNavegacao:
+    '''Clica no seletor e retorna a resposta da navegação disparada pelo clique.'''
+
+    __slots__ = ("seletor", "timeout")
+
+    def __init__(self, seletor, timeout):
+        self.seletor = seletor
+        self.timeout = timeout
+
+def chamar(caminho, *args, **kwargs):
+    '''Operação que chama `page.<caminho>(*args, **kwargs)`.'''
+    return Chamada(caminho, args, kwargs)
+
+def chamar_em(alvo, caminho, *args, **kwargs):
+    '''Operação que chama `alvo.<caminho>(*args, **kwargs)`, para objetos obtidos em passos anteriores.'''
+    return Chamada(caminho, args, kwargs, alvo)
+
+def ler(caminho):
+    '''Operação que lê o atributo `page.<caminho>` (por exemplo, "url").'''
+    return Chamada(caminho)
+
+def pagina():
+    '''Operação que retorna a própria página.'''
+    return Chamada("")
+
+def bloqueante(funcao, *args):
+    '''Operação que executa `funcao(*args)`; no motor assíncrono, no executor de threads.'''
+    return Bloqueante(funcao, args)
+
+def chamada_bloqueante(funcao, *args):
+    '''Passos de uma única chamada bloqueante, para compor com `yield from`.'''
+    return (yield Bloqueante(funcao, args))
+
+def _avancar(passos, resultado, erro):
+    if erro is not None:
+        return passos.throw(erro)
+    return passos.send(resultado)
+
+def executar_passos(page, passos):
+    '''Executa os passos com playwright.sync_api e retorna o valor final do gerador.'''
+    resultado, erro = None, None
+    while True:
+        try:
+            operacao = _avancar(passos, resultado, erro)
+        except StopIteration as fim:
+            return fim.value
+        resultado, erro = None, None
+        try:
+            if isinstance(operacao, Bloqueante):
+                resultado = operacao.funcao(*operacao.args)
+            elif isinstance(operacao, CliqueComNavegacao):
+                with page.expect_navigation(timeout=operacao.timeout) as navegacao:
+                    page.click(operacao.seletor)
+                resultado = navegacao.value
+            else:
+                valor = operacao.resolver(page)
+                resultado = valor if operacao.args is None else valor(*operacao.args, **operacao.kwargs)
+        except Exception as e:
+            erro = e
+
+async def executar_passos_async(page, passos, em_thread):
+    """
+    Executa os passos com playwright.async_api, aguardando cada chamada. As
+    operações bloqueantes são repassadas a `em_thread(funcao, *args)`.
+    """
+    resultado, erro = None, None
+    while True:
+        try:
+            operacao = _avancar(passos, resultado, erro)
+        except StopIteration as fim:
+            return fim.value
+        resultado, erro = None, None
+        try:
+            if isinstance(operacao, Bloqueante):
+                resultado = await em_thread(operacao.funcao, *operacao.args)
+            elif isinstance(operacao, CliqueComNavegacao):
+                async with page.expect_navigation(timeout=operacao.timeout) as navegacao:
+                    await page.click(operacao.seletor)
+                resultado = await navegacao.value
+            else:
+                valor = operacao.resolver(page)
+                resultado = valor if operacao.args is None else valor(*operacao.args, **operacao.kwargs)
+                # Alguns métodos são síncronos também na API assíncrona (is_closed, get_by_text...)
+                if inspect.isawaitable(resultado):
+                    resultado = await resultado
+        except Exception as e:
+            erro = e
@@ -0,0 +1,65 @@
+'''
+Pipeline de leitura em segundo plano com fila limitada.
+
+Uma thread produtora consome um iterável (normalmente a leitura do banco em
+blocos) e alimenta uma fila de tamanho fixo, de forma que o processamento no
+navegador ocorra em paralelo com a leitura e o uso de memória fique constante.
+'''
+# pylint: disable=broad-exception-caught
+
+import queue
+import threading
+from logs import log_step, numero_env
+
+# Sentinela que indica o fim dos itens para cada consumidor
+FIM = object()
+
+def tamanho_fila_padrao():
+    '''Tamanho máximo da fila entre a leitura do banco e o navegador (AUTOTASK_TAMANHO_FILA).'''
+    return numero_env("AUTOTASK_TAMANHO_FILA", 100, minimo=1)
+
+def iniciar_produtor(iteravel, fila, cancelar, consumidores=1):
+    """
+    Inicia a thread que copia os itens do iterável para a fila. Ao terminar,
+    coloca um FIM para cada consumidor. Se `cancelar` for sinalizado, a leitura
+    é interrompida e o iterável é fechado.
+    """
+    def colocar(item):
+        while not cancelar.is_set():
+            try:
+                fila.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produzir():
+        try:
+            for item in iteravel:
+                if not colocar(item):
+                    break
+        except Exception as e:
+            log_step(f"[ERRO] Erro ao ler registros: {e}")
+        finally:
+            if hasattr(iteravel, "close"):
+                iteravel.close()
+            for _ in range(consumidores):
+                colocar(FIM)
+
+    thread = threading.Thread(target=produzir, name="produtor", daemon=True)
+    thread.start()
+    return thread
+
+def iterar_em_segundo_plano(iteravel, tamanho=None):
+    '''Itera sobre `iteravel` lido por uma thread produtora através de uma fila limitada.'''
+    fila = queue.Queue(maxsize=tamanho or tamanho_fila_padrao())
+    cancelar = threading.Event()
+    iniciar_produtor(iteravel, fila, cancelar)
+    try:
+        while True:
+            item = fila.get()
+            if item is FIM:
+                return
+            yield item
+    finally:
+        cancelar.set()
@@ -0,0 +1,130 @@
+'''
+Validação e planejamento dos registros entre a consulta e o navegador.
+
+Descarta registros repetidos (mesmo ID_LAWSYSTEM) e registros com METADADOS
+inválidos antes que custem um carregamento de página, e reordena o trabalho por
+escritório e envolvido, em janelas de tamanho limitado, para que tarefas
+seguidas usem os mesmos valores de autocomplete e aproveitem o cache.
+'''
+# pylint: disable=broad-exception-caught
+
+from collections import deque
+from itertools import chain
+from de_para import ESCRITORIO_PADRAO, ENVOLVIDO_PADRAO, buscar_dados
+from logs import log_step, numero_env
+
+# Registros rejeitados já registrados no log; no modo serviço eles podem ser lidos a cada consulta
+_rejeicoes_registradas = set()
+
+def tamanho_janela_padrao():
+    '''Quantidade de registros reordenados por vez (AUTOTASK_JANELA_PLANEJAMENTO, padrão 200).'''
+    return numero_env("AUTOTASK_JANELA_PLANEJAMENTO", 200, minimo=1)
+
+class Planejamento:
+    '''Filtra, deduplica e ordena os registros de uma leitura.'''
+
+    def __init__(self, extrair_metadados, de_para, descartar=None, janela=None):
+        self.extrair_metadados = extrair_metadados
+        self.de_para = de_para
+        self.descartar = descartar
+        self.janela = janela or tamanho_janela_padrao()
+        self.vistos = set()
+        self.aceitos = 0
+        self.duplicados = 0
+        self.invalidos = 0
+        self.grupos = set()
+        self.sem_de_para = set()
+        self.rejeicoes_novas = 0
+        self._janela = []
+        self._restantes = deque()
+
+    def validar(self, row):
+        '''Retorna o motivo da rejeição do registro, ou None se ele é válido.'''
+        try:
+            idprocesso, coordenacao = self.extrair_metadados(row)
+        except Exception as e:
+            return f"METADADOS inválido: {e}"
+        if not str(idprocesso or "").strip():
+            return "METADADOS sem idProcesso"
+        if not str(coordenacao or "").strip():
+            return "METADADOS sem coordenacao"
+        return None
+
+    def chave(self, row):
+        '''(escritório, envolvido) de destino do registro, usados na ordenação.'''
+        coordenacao = self.extrair_metadados(row)[1]
+        dados = buscar_dados(self.de_para, coordenacao)
+        if dados is None:
+            self._avisar_sem_de_para(coordenacao)
+            dados = {}
+        return (str(dados.get('Escritório', ESCRITORIO_PADRAO)), str(dados.get('Envolvido', ENVOLVIDO_PADRAO)))
+
+    def _avisar_sem_de_para(self, coordenacao):
+        '''Avisa uma única vez por coordenação sem correspondência no de-para.'''
+        if coordenacao in self.sem_de_para:
+            return
+        self.sem_de_para.add(coordenacao)
+        dica = ""
+        if not str(coordenacao).isascii():
+            # Acentos decodificados com a codificação errada não correspondem a nenhuma entrada
+            dica = " Se o nome estiver com acentos corrompidos, confira a codificação dos METADADOS ou use AUTOTASK_PROJECAO=completa."
+        log_step(f"[ERRO] Coordenação sem correspondência no de-para, será usado o destino padrão: {coordenacao}.{dica}")
+
+    def _ordenar(self, janela):
+        chaves = [(self.chave(row), indice) for indice, row in enumerate(janela)]
+        self.grupos.update(chave for chave, _ in chaves)
+        return [janela[indice] for _, indice in sorted(chaves)]
+
+    def retidos(self):
+        """
+        Chaves (DATA_DIV, ID_LAWSYSTEM) dos registros aceitos que ainda não foram
+        liberados: os da janela em formação e os ainda não repassados, incluindo
+        o último entregue, que só é liberado quando o próximo é pedido.
+        """
+        return [(row["DATA_DIV"], row["ID_LAWSYSTEM"]) for row in chain(self._janela, self._restantes)]
+
+    def _emitir(self):
+        self._restantes = deque(self._ordenar(self._janela))
+        self._janela = []
+        while self._restantes:
+            yield self._restantes[0]
+            self._restantes.popleft()
+
+    def planejar(self, registros):
+        '''Repassa os registros válidos e inéditos, reordenados a cada janela.'''
+        try:
+            for row in registros:
+                id_lawsystem = row["ID_LAWSYSTEM"]
+                if id_lawsystem in self.vistos:
+                    self.duplicados += 1
+                    continue
+                self.vistos.add(id_lawsystem)
+                motivo = self.validar(row)
+                if motivo:
+                    self.invalidos += 1
+                    if id_lawsystem not in _rejeicoes_registradas:
+                        _rejeicoes_registradas.add(id_lawsystem)
+                        self.rejeicoes_novas += 1
+                        log_step(f"[ERRO] Registro rejeitado antes do navegador: id andamento={id_lawsystem}: {motivo}")
+                    if self.descartar is not None:
+                        self.descartar(row, motivo)
+                    continue
+                self.aceitos += 1
+                self._janela.append(row)
+                if len(self._janela) >= self.janela:
+                    yield from self._emitir()
+            yield from self._emitir()
+        finally:
+            self.relatorio()
+
+    def relatorio(self):
+        '''Registra quantos registros foram aceitos e quantas operações no navegador foram evitadas.'''
+        evitadas = self.duplicados + self.invalidos
+        # Uma leitura só com rejeições já registradas não tem novidade a informar
+        if not (self.aceitos or self.duplicados or self.rejeicoes_novas):
+            return
+        log_step(
+            f"Planejamento: {self.aceitos} registros em {len(self.grupos)} grupos de escritório/envolvido, "
+            f"{self.duplicados} duplicados e {self.invalidos} inválidos descartados "
+            f"({evitadas} cadastros no navegador evitados)."
+        )
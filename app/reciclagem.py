@@ -0,0 +1,116 @@
+'''
+Reciclagem de páginas e contextos do navegador por marcas de uso.
+
+Ao longo de milhares de navegações a memória do renderer e do driver do
+Playwright cresce e as tarefas ficam mais lentas. Cada worker conta as tarefas
+da página atual e, periodicamente, mede o heap JavaScript do renderer (via CDP)
+e o RSS dos processos da automação. Ao cruzar um dos limites configurados, a
+página/contexto é recriado reaproveitando a sessão autenticada, sem novo login.
+'''
+# pylint: disable=broad-exception-caught
+
+import os
+from logs import numero_env
+from passos import bloqueante, chamar, chamar_em, pagina
+
+MB = 1024 * 1024
+
+def heap_js_mb():
+    '''Passos que medem o heap JavaScript em uso no renderer da página, em MiB (None fora do Chromium).'''
+    try:
+        page = yield pagina()
+        sessao = yield chamar("context.new_cdp_session", page)
+        try:
+            uso = yield chamar_em(sessao, "send", "Runtime.getHeapUsage")
+        except Exception:
+            uso = None
+        yield chamar_em(sessao, "detach")
+        return uso["usedSize"] / MB if uso else None
+    except Exception:
+        return None
+
+def _rss_proc_mb():
+    # Sem psutil, no Linux: soma o RSS deste processo e de todos os descendentes via /proc
+    pais = {}
+    rss = {}
+    tamanho_pagina = os.sysconf("SC_PAGE_SIZE")
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat", encoding="utf-8") as arquivo:
+                campos = arquivo.read().rsplit(")", 1)[1].split()
+            pais[int(entrada)] = int(campos[1])
+            rss[int(entrada)] = int(campos[21]) * tamanho_pagina
+        except (OSError, IndexError, ValueError):
+            continue
+    processos = {os.getpid()}
+    adicionados = True
+    while adicionados:
+        novos = {pid for pid, pai in pais.items() if pai in processos} - processos
+        processos |= novos
+        adicionados = bool(novos)
+    return sum(rss.get(pid, 0) for pid in processos) / MB
+
+def rss_processos_mb():
+    """
+    RSS somado deste processo e dos processos filhos (driver do Playwright e
+    navegador), em MiB. Usa psutil quando instalado; sem ele, só no Linux.
+    """
+    try:
+        import psutil # pylint: disable=import-outside-toplevel
+        processo = psutil.Process()
+        total = processo.memory_info().rss
+        for filho in processo.children(recursive=True):
+            try:
+                total += filho.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / MB
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    if os.path.isdir("/proc"):
+        try:
+            return _rss_proc_mb()
+        except Exception:
+            return None
+    return None
+
+class ControleReciclagem:
+    '''Decide quando a página do worker deve ser reciclada.'''
+
+    def __init__(self):
+        self.max_tarefas = numero_env("AUTOTASK_RECICLAR_TAREFAS", 250, minimo=0)
+        self.max_heap_mb = numero_env("AUTOTASK_RECICLAR_HEAP_MB", 256, float, minimo=0.0)
+        self.max_rss_mb = numero_env("AUTOTASK_RECICLAR_RSS_MB", 0, float, minimo=0.0)
+        self.intervalo = numero_env("AUTOTASK_INTERVALO_MEMORIA", 10, minimo=1)
+        self.tarefas = 0
+
+    def contar(self):
+        '''Conta uma tarefa e indica se é hora de medir a memória.'''
+        self.tarefas += 1
+        return self.tarefas % self.intervalo == 0
+
+    def motivo(self, heap_mb=None, rss_mb=None):
+        '''Retorna o motivo da reciclagem, ou None se nenhum limite foi cruzado.'''
+        if self.max_tarefas and self.tarefas >= self.max_tarefas:
+            return f"{self.tarefas} tarefas"
+        if self.max_heap_mb and heap_mb is not None and heap_mb >= self.max_heap_mb:
+            return f"heap JS de {heap_mb:.0f} MiB"
+        if self.max_rss_mb and rss_mb is not None and rss_mb >= self.max_rss_mb:
+            return f"RSS de {rss_mb:.0f} MiB"
+        return None
+
+    def verificar(self):
+        '''Passos que contam a tarefa concluída na página e retornam o motivo para reciclá-la, se houver.'''
+        if not self.contar():
+            return self.motivo()
+        heap = (yield from heap_js_mb()) if self.max_heap_mb else None
+        rss = (yield bloqueante(rss_processos_mb)) if self.max_rss_mb else None
+        return self.motivo(heap, rss)
+
+    def reiniciar(self):
+        '''Zera a contagem após a reciclagem.'''
+        self.tarefas = 0
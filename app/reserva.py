@@ -0,0 +1,156 @@
+'''
+Reserva de registros em dbo.RECORTES para execução em várias máquinas.
+
+Cada nó reserva um lote de registros pendentes com um único UPDATE ... OUTPUT
+atômico, gravando o dono e a validade da reserva. Registros reservados por
+outro nó são ignorados (READPAST) até a reserva expirar, quando voltam a ficar
+disponíveis automaticamente. Enquanto a execução estiver em andamento, as
+reservas dos registros lidos são renovadas periodicamente, para que não
+expirem com registros ainda aguardando o navegador. Requer as colunas
+RESERVADO_POR e RESERVADO_ATE (ver README).
+'''
+# pylint: disable=line-too-long
+# pylint: disable=broad-exception-caught
+
+import os
+import socket
+import threading
+from logs import log_step, numero_env
+from gravacao import LIMITE_PARAMETROS, criar_tabela_ids
+
+# O OUTPUT grava apenas os IDs reservados (ver criar_tabela_ids); as colunas são lidas em seguida
+CONSULTA_RESERVA = criar_tabela_ids("#reservados") + """
+    WITH lote AS (
+        SELECT TOP ({tamanho}) *
+        FROM dbo.RECORTES WITH (ROWLOCK, UPDLOCK, READPAST)
+        WHERE {filtro} AND (RESERVADO_ATE IS NULL OR RESERVADO_ATE < SYSUTCDATETIME()){limite}
+        ORDER BY DATA_DIV, ID_LAWSYSTEM
+    )
+    UPDATE lote SET RESERVADO_POR = %s, RESERVADO_ATE = DATEADD(SECOND, %s, SYSUTCDATETIME())
+    OUTPUT inserted.ID_LAWSYSTEM INTO #reservados;
+    SELECT {colunas}
+    FROM dbo.RECORTES
+    WHERE ID_LAWSYSTEM IN (SELECT ID_LAWSYSTEM FROM #reservados)
+    ORDER BY DATA_DIV, ID_LAWSYSTEM;
+    DROP TABLE #reservados;
+"""
+
+CONSULTA_LIBERACAO = """
+    UPDATE dbo.RECORTES SET RESERVADO_POR = NULL, RESERVADO_ATE = NULL
+    WHERE RESERVADO_POR = %s AND IS_TAREFA = 'N'
+"""
+
+CONSULTA_RENOVACAO = """
+    UPDATE dbo.RECORTES SET RESERVADO_ATE = DATEADD(SECOND, %s, SYSUTCDATETIME())
+    WHERE RESERVADO_POR = %s AND IS_TAREFA = 'N' AND ID_LAWSYSTEM IN ({marcadores})
+"""
+
+def reserva_ativa():
+    '''Indica se a reserva de registros entre nós está habilitada (AUTOTASK_RESERVA=1).'''
+    return os.getenv("AUTOTASK_RESERVA") == "1"
+
+class Reserva:
+    '''Reserva lotes de registros em nome deste nó.'''
+
+    def __init__(self, dono=None, tamanho_lote=None, duracao_s=None):
+        self.dono = (dono or os.getenv("AUTOTASK_NO") or f"{socket.gethostname()}-{os.getpid()}")[:100]
+        self.tamanho_lote = max(1, tamanho_lote or numero_env("AUTOTASK_LOTE_RESERVA", 50))
+        self.duracao_s = max(60, duracao_s or numero_env("AUTOTASK_DURACAO_RESERVA_S", 900))
+        # IDs reservados na rodada atual, cujas reservas são renovadas até o fim da rodada
+        self._reservados = set()
+        self._lock = threading.Lock()
+        self._encerrar = threading.Event()
+        self._thread = None
+
+    def reservar(self, conn, colunas, filtro, marca=None):
+        """
+        Reserva o próximo lote e retorna os registros reservados, com as
+        `colunas` informadas. `filtro` é a condição dos registros pendentes, sem
+        parâmetros. Com `marca` (DATA_DIV, ID_LAWSYSTEM), apenas registros a
+        partir da DATA_DIV da marca d'água são considerados, limitando a
+        varredura como no modo incremental.
+        """
+        # Com parâmetros, os '%' literais dos LIKE precisam ser escapados
+        limite = " AND DATA_DIV >= %s" if marca is not None else ""
+        query = CONSULTA_RESERVA.format(tamanho=self.tamanho_lote, filtro=filtro.replace("%", "%%"), limite=limite, colunas=colunas)
+        parametros = (marca[0],) if marca is not None else ()
+        cursor = conn.cursor(as_dict=True)
+        cursor.execute(query, (*parametros, self.dono, self.duracao_s))
+        lote = cursor.fetchall()
+        conn.commit()
+        with self._lock:
+            self._reservados.update(row["ID_LAWSYSTEM"] for row in lote)
+        return lote
+
+    def renovar(self, conn):
+        '''Prorroga as reservas da rodada atual que ainda não viraram tarefa.'''
+        with self._lock:
+            ids = list(self._reservados)
+        if not ids:
+            return 0
+        renovadas = 0
+        cursor = conn.cursor()
+        for inicio in range(0, len(ids), LIMITE_PARAMETROS):
+            parte = ids[inicio:inicio + LIMITE_PARAMETROS]
+            cursor.execute(CONSULTA_RENOVACAO.format(marcadores=", ".join(["%s"] * len(parte))), (self.duracao_s, self.dono, *parte))
+            renovadas += max(cursor.rowcount, 0)
+        conn.commit()
+        return renovadas
+
+    def encerrar_rodada(self, manter=()):
+        """
+        Deixa de renovar as reservas lidas até aqui, exceto as de `manter`
+        (tarefas já criadas cujo retorno ainda não foi gravado no banco); as que
+        não viraram tarefa expiram normalmente.
+        """
+        with self._lock:
+            self._reservados.intersection_update(manter)
+
+    def iniciar_renovacao(self, conectar):
+        '''Inicia a thread que renova as reservas a cada terço da duração, com conexão própria.'''
+        def executar():
+            conn = None
+            while not self._encerrar.wait(self.duracao_s / 3):
+                try:
+                    conn = conn or conectar()
+                    renovadas = self.renovar(conn)
+                    if renovadas:
+                        log_step(f"{renovadas} reservas de {self.dono} renovadas por {self.duracao_s} s.")
+                except Exception as e:
+                    log_step(f"[ERRO] Erro ao renovar as reservas de {self.dono}: {e}")
+                    try:
+                        if conn is not None:
+                            conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+        self._thread = threading.Thread(target=executar, name="renovacao-reservas", daemon=True)
+        self._thread.start()
+
+    def encerrar(self):
+        '''Interrompe a renovação das reservas.'''
+        self._encerrar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def liberar(self, conn, manter=()):
+        """
+        Devolve os registros reservados por este nó que não foram concluídos,
+        exceto os de `manter` (tarefas criadas sem retorno gravado), que
+        continuam reservados até expirar.
+        """
+        manter = list(manter)
+        if len(manter) > LIMITE_PARAMETROS:
+            log_step(f"[ERRO] {len(manter)} andamentos sem retorno gravado; as reservas de {self.dono} não serão devolvidas e expiram em {self.duracao_s} s.")
+            return
+        query = CONSULTA_LIBERACAO
+        if manter:
+            query += f" AND ID_LAWSYSTEM NOT IN ({', '.join(['%s'] * len(manter))})"
+        cursor = conn.cursor()
+        cursor.execute(query, (self.dono, *manter))
+        conn.commit()
+        if cursor.rowcount > 0:
+            log_step(f"{cursor.rowcount} reservas não concluídas devolvidas por {self.dono}.")
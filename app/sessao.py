@@ -0,0 +1,70 @@
+'''
+Cache persistente da sessão autenticada do LawSystem.
+
+O storage_state do contexto é salvo em disco após cada login e recarregado na
+inicialização, e uma verificação barata (uma requisição sem seguir
+redirecionamentos) decide se é realmente necessário refazer o login.
+'''
+# pylint: disable=broad-exception-caught
+
+import json
+import os
+import threading
+from estado import caminho_estado
+from logs import log_step
+from enderecos import URL_VERIFICACAO_SESSAO
+from passos import chamar
+
+ARQUIVO_SESSAO = "sessao.json"
+
+_lock = threading.Lock()
+
+def carregar_sessao():
+    """
+    Retorna o storage_state salvo para ser usado em browser.new_context, ou None
+    se não existir sessão salva ou o arquivo estiver corrompido.
+    """
+    caminho = caminho_estado(ARQUIVO_SESSAO)
+    if not caminho.exists():
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError) as e:
+        log_step(f"[ERRO] Sessão salva inválida, será feito novo login: {e}")
+        return None
+
+def gravar_storage_state(storage_state):
+    '''Grava em disco um storage_state já obtido do contexto.'''
+    caminho = caminho_estado(ARQUIVO_SESSAO)
+    temporario = caminho.with_suffix(".tmp")
+    try:
+        with _lock:
+            # Os cookies dão acesso à conta: somente o próprio usuário pode ler o arquivo
+            descritor = os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+                json.dump(storage_state, arquivo)
+            os.chmod(temporario, 0o600)
+            os.replace(temporario, caminho)
+    except Exception as e:
+        log_step(f"[ERRO] Não foi possível salvar a sessão: {e}")
+
+def salvar_sessao():
+    '''Passos que salvam em disco o storage_state do contexto autenticado.'''
+    try:
+        gravar_storage_state((yield chamar("context.storage_state")))
+    except Exception as e:
+        log_step(f"[ERRO] Não foi possível salvar a sessão: {e}")
+
+def sessao_valida(timeout=5000):
+    """
+    Passos que verificam se a sessão do contexto ainda está autenticada. Uma
+    sessão expirada é redirecionada para o login, então qualquer resposta
+    diferente de 200 sem redirecionamento é considerada inválida.
+    """
+    try:
+        resposta = yield chamar("context.request.get", URL_VERIFICACAO_SESSAO, max_redirects=0, timeout=timeout)
+        return resposta.status == 200
+    except Exception as e:
+        log_step(f"[ERRO] Falha ao verificar a sessão: {e}")
+        return False
@@ -0,0 +1,226 @@
+'''
+Benchmark de ponta a ponta da automação contra o LawSystem e o banco simulados.
+
+Executa os caminhos reais de faz_login, processar_resultados e set_data_from_db
+usando o servidor de benchmark/servidor_lawsystem.py e uma fonte de RECORTES em
+memória, com latência configurável, e informa a vazão, a latência por tarefa
+(p50/p95) e o pico de memória.
+
+Uso:
+    python benchmark/executar.py --registros 200 --latencia-servidor-ms 50 --workers 2 --motor http
+'''
+# pylint: disable=line-too-long
+# pylint: disable=import-outside-toplevel
+# pylint: disable=wrong-import-position
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / "app"))
+sys.path.insert(0, str(RAIZ / "benchmark"))
+
+from servidor_lawsystem import USUARIO, SENHA, CAMINHO_INICIAL, iniciar_servidor
+
+COORDENACOES = ["Coordenação Cível", "Coordenação Trabalhista", "Coordenação Tributária", "Coordenação Previdenciária"]
+
+class BancoSimulado:
+    '''Fonte de RECORTES em memória que responde às consultas feitas pela automação.'''
+
+    def __init__(self, registros, latencia_ms=0):
+        self.latencia = latencia_ms / 1000
+        self.lock = threading.Lock()
+        inicio = datetime(2024, 1, 1, 8)
+        self.linhas = [
+            {
+                "DATA_DIV": inicio + timedelta(minutes=i),
+                "ID_LAWSYSTEM": 100000 + i,
+                "PROCESSO": f"0000{i:06d}-00.2024.5.00.0000",
+                # Como no SQL Server, a projeção enxuta devolve esses campos em bytes na codepage 850
+                "ID_PROCESSO": str(500000 + i).encode("850"),
+                "COORDENACAO": COORDENACOES[i % len(COORDENACOES)].encode("850"),
+                "IS_TAREFA": "N",
+            }
+            for i in range(registros)
+        ]
+        self.atualizados = 0
+
+    def conectar(self):
+        '''Fábrica de conexões com a mesma interface usada de pymssql.'''
+        time.sleep(self.latencia)
+        return ConexaoSimulada(self)
+
+class ConexaoSimulada:
+    '''Conexão e cursor simulados, suficientes para SELECT em blocos e UPDATE ... OUTPUT.'''
+
+    def __init__(self, banco):
+        self.banco = banco
+        self.rowcount = 0
+        self._resultado = []
+
+    def cursor(self, as_dict=False): # pylint: disable=unused-argument
+        return self
+
+    def execute(self, query, parametros=None):
+        time.sleep(self.banco.latencia)
+        if "UPDATE" in query:
+            ids = set(parametros[1:])
+            with self.banco.lock:
+                alterados = [linha for linha in self.banco.linhas if linha["ID_LAWSYSTEM"] in ids]
+                for linha in alterados:
+                    linha["IS_TAREFA"] = parametros[0]
+                self.banco.atualizados += len(alterados)
+            self.rowcount = len(alterados)
+            self._resultado = [(linha["ID_LAWSYSTEM"],) for linha in alterados]
+        else:
+            with self.banco.lock:
+                self._resultado = [
+                    {chave: valor for chave, valor in linha.items() if chave != "IS_TAREFA"}
+                    for linha in self.banco.linhas if linha["IS_TAREFA"] == "N"
+                ]
+
+    def fetchmany(self, tamanho):
+        bloco, self._resultado = self._resultado[:tamanho], self._resultado[tamanho:]
+        return bloco
+
+    def fetchall(self):
+        bloco, self._resultado = self._resultado, []
+        return bloco
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+def percentil(valores, p):
+    '''Percentil por interpolação linear.'''
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+def pico_memoria_mb():
+    '''Retorna o pico de RSS (MiB) do processo e dos processos filhos encerrados, quando disponível.'''
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    fator = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / fator,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / fator,
+    )
+
+def configurar_ambiente(args, porta, diretorio_estado):
+    '''Aponta a automação para os serviços simulados; precisa acontecer antes de importar o app.'''
+    os.environ.update({
+        "LAWSYSTEM_URL": f"http://127.0.0.1:{porta}",
+        "LAWSYSTEM_HOST_INICIAL": CAMINHO_INICIAL,
+        "LAWSYSTEM_USERNAME": USUARIO,
+        "LAWSYSTEM_PASSWORD": SENHA,
+        "LAWSYSTEM_ID_TIPO": "TipoText:Prazo Agendado:1",
+        "AUTOTASK_DIR_ESTADO": diretorio_estado,
+        "AUTOTASK_MOTOR": args.motor,
+        "AUTOTASK_WORKERS": str(args.workers),
+        "AUTOTASK_HEADLESS": "0" if args.exibir else "1",
+    })
+
+def montar_de_para(motor):
+    '''Tabela de-para compilada equivalente à planilha, com IDs quando o motor HTTP é usado.'''
+    from de_para import normalizar_chave
+    de_para = {}
+    for coordenacao in COORDENACOES:
+        dados = {"Responsável": coordenacao, "Escritório": f"Escritório {coordenacao}", "Envolvido": f"Advogado {coordenacao}"}
+        if motor == "http":
+            dados["ID Escritório"] = f"SourceOfficeText:{dados['Escritório']}:3"
+            dados["ID Envolvido"] = f"EnvolvidoText:{dados['Envolvido']}:0"
+        de_para[normalizar_chave(coordenacao)] = dados
+    return de_para
+
+def executar(args):
+    '''Executa o benchmark e imprime o relatório.'''
+    servidor, estado = iniciar_servidor(args.latencia_servidor_ms)
+    banco = BancoSimulado(args.registros, args.latencia_db_ms)
+
+    with tempfile.TemporaryDirectory() as diretorio_estado:
+        configurar_ambiente(args, servidor.server_port, diretorio_estado)
+        import main
+        from gravacao import FilaGravacao
+        from navegador import FiltroRequisicoes, opcoes_lancamento, criar_contexto
+        from playwright.sync_api import sync_playwright
+
+        # Substitui apenas a conexão com o SQL Server; consultas e gravações seguem o caminho real
+        main.get_curso_data_from_db = banco.conectar
+
+        duracoes = []
+        processar_linha = main.processar_linha
+        def processar_linha_medida(*parametros):
+            inicio = time.perf_counter()
+            try:
+                return processar_linha(*parametros)
+            finally:
+                duracoes.append(time.perf_counter() - inicio)
+        main.processar_linha = processar_linha_medida
+
+        de_para = montar_de_para(args.motor)
+        main.FILA_GRAVACAO = FilaGravacao(banco.conectar)
+        inicio = time.perf_counter()
+        with sync_playwright() as p:
+            browser = p.chromium.launch(**opcoes_lancamento())
+            filtro = FiltroRequisicoes()
+            context = criar_contexto(browser, None, filtro)
+            page = context.new_page()
+            try:
+                if not main.faz_login(page):
+                    print("[ERRO] Login no servidor simulado falhou.")
+                    return
+                inicio_tarefas = time.perf_counter()
+                registros = main.iterar_dados_do_db()
+                if args.workers > 1:
+                    main.processar_em_paralelo(registros, context.storage_state(), de_para, args.workers, filtro)
+                else:
+                    main.processar_resultados(registros, page, de_para, filtro=filtro)
+                fim_tarefas = time.perf_counter()
+            finally:
+                browser.close()
+        main.FILA_GRAVACAO.encerrar()
+        main.FILA_GRAVACAO = None
+        servidor.shutdown()
+
+    pico_processo, pico_filhos = pico_memoria_mb()
+    duracao = fim_tarefas - inicio_tarefas
+    criadas = len(estado.tarefas)
+    print()
+    print("[INFO] ===== Resultado do benchmark =====")
+    print(f"[INFO] Motor: {args.motor} | Workers: {args.workers} | Registros: {args.registros}")
+    print(f"[INFO] Latência simulada: servidor {args.latencia_servidor_ms} ms, banco {args.latencia_db_ms} ms")
+    print(f"[INFO] Tarefas criadas: {criadas} (duplicadas: {estado.duplicadas}) | Registros atualizados no banco: {banco.atualizados}")
+    print(f"[INFO] Tempo total: {time.perf_counter() - inicio:.1f} s | Processamento: {duracao:.1f} s")
+    print(f"[INFO] Vazão: {criadas / duracao * 60 if duracao else 0:.1f} tarefas/min")
+    print(f"[INFO] Latência por tarefa: p50 {percentil(duracoes, 50) * 1000:.0f} ms | p95 {percentil(duracoes, 95) * 1000:.0f} ms")
+    if pico_processo is not None:
+        print(f"[INFO] Pico de RSS: processo {pico_processo:.0f} MiB | filhos {pico_filhos:.0f} MiB")
+
+def main():
+    '''Lê os argumentos de linha de comando e executa o benchmark.'''
+    parser = argparse.ArgumentParser(description="Benchmark da automação contra o LawSystem simulado.")
+    parser.add_argument("--registros", type=int, default=50, help="Quantidade de RECORTES simulados.")
+    parser.add_argument("--latencia-servidor-ms", type=int, default=0, help="Latência de cada resposta do LawSystem simulado.")
+    parser.add_argument("--latencia-db-ms", type=int, default=0, help="Latência de cada conexão e comando no banco simulado.")
+    parser.add_argument("--workers", type=int, default=1, help="Quantidade de workers (AUTOTASK_WORKERS).")
+    parser.add_argument("--motor", choices=["navegador", "http"], default="navegador", help="Motor de cadastro (AUTOTASK_MOTOR).")
+    parser.add_argument("--exibir", action="store_true", help="Exibe a janela do navegador.")
+    executar(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+'''
+Servidor HTTP local que simula as páginas do LawSystem usadas pela automação.
+
+Reproduz a página de login (input#Username, mensagem de erro em #form0), o
+formulário de createFromAndamento com autocompletes no estilo jQuery UI e os
+spans "Remover lembrete", e a página exibida após salvar. A latência de cada
+resposta é configurável para simular o servidor real.
+'''
+# pylint: disable=line-too-long
+
+import html
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse, urlencode
+
+USUARIO = "benchmark"
+SENHA = "benchmark"
+CAMINHO_INICIAL = "/firm.lawsystem.com.br/inicio"
+MARCADOR_SUCESSO = "A página solicitada não foi encontrada."
+OPCOES_AUTOCOMPLETE = 5
+CAMPOS_OBRIGATORIOS = ("SourceOffice", "ResponsibleOffice", "Tipo", "EnvolvidoId", "DtInicial", "DtFinal", "HrFinal")
+
+PAGINA_LOGIN = """<!DOCTYPE html>
+<html><head><title>Login</title></head><body>
+<form id="form0" method="post" action="/login">
+{erro}
+<p><input id="Username" name="Username" type="text"></p>
+<p><input id="Password" name="Password" type="password"></p>
+<button type="submit">Entrar</button>
+</form>
+</body></html>"""
+
+SCRIPT_AUTOCOMPLETE = """
+function configurarAutocomplete(idTexto, idOculto) {
+  const campo = document.getElementById(idTexto);
+  const lista = document.createElement('ul');
+  lista.className = 'ui-autocomplete';
+  lista.style.display = 'none';
+  document.body.appendChild(lista);
+  let ativo = -1;
+  const fechar = () => {
+    lista.style.display = 'none';
+    for (const li of lista.children) li.classList.remove('ui-state-active');
+    ativo = -1;
+  };
+  campo.addEventListener('keydown', async (ev) => {
+    if (ev.key === 'Enter') {
+      ev.preventDefault();
+      if (lista.style.display === 'none') {
+        const resposta = await fetch('/autocomplete?' + new URLSearchParams({campo: idTexto, termo: campo.value}));
+        const opcoes = await resposta.json();
+        lista.innerHTML = '';
+        for (const opcao of opcoes) {
+          const li = document.createElement('li');
+          li.textContent = opcao.rotulo;
+          li.dataset.valor = opcao.valor;
+          lista.appendChild(li);
+        }
+        lista.style.display = 'block';
+      } else {
+        const li = lista.children[ativo];
+        if (li) {
+          campo.value = li.textContent;
+          if (idOculto) document.getElementById(idOculto).value = li.dataset.valor;
+        }
+        fechar();
+      }
+    } else if (ev.key === 'ArrowDown' && lista.style.display !== 'none' && lista.children.length) {
+      ev.preventDefault();
+      if (ativo >= 0) lista.children[ativo].classList.remove('ui-state-active');
+      ativo = Math.min(ativo + 1, lista.children.length - 1);
+      lista.children[ativo].classList.add('ui-state-active');
+    }
+  });
+}
+configurarAutocomplete('SourceOfficeText', 'SourceOffice');
+configurarAutocomplete('ResponsibleOfficeText', 'ResponsibleOffice');
+configurarAutocomplete('TipoText', 'Tipo');
+configurarAutocomplete('EnvolvidoText', 'EnvolvidoId');
+"""
+
+PAGINA_CADASTRO = """<!DOCTYPE html>
+<html><head><title>Nova tarefa</title></head><body>
+{erro}
+<form id="formTarefa" method="post" action="{acao}">
+<input type="hidden" name="__RequestVerificationToken" value="{token}">
+<input type="hidden" name="IdAndamento" value="{id_andamento}">
+<input id="SourceOfficeText" name="SourceOfficeText" type="text"><input id="SourceOffice" name="SourceOffice" type="hidden">
+<input id="ResponsibleOfficeText" name="ResponsibleOfficeText" type="text"><input id="ResponsibleOffice" name="ResponsibleOffice" type="hidden">
+<input id="Descricao" name="Descricao" type="text">
+<input id="TipoText" name="TipoText" type="text"><input id="Tipo" name="Tipo" type="hidden">
+<input id="DtInicial" name="DtInicial" type="text">
+<input id="HrFinal" name="HrFinal" type="text">
+<input id="DtFinal" name="DtFinal" type="text">
+<input name="Local" type="text"><input name="Observacao" type="text"><input name="Prioridade" type="text">
+<input name="Etiqueta" type="text"><input name="Vinculo" type="text"><input name="Referencia" type="text">
+<input id="EnvolvidoText" name="EnvolvidoText" type="text"><input id="EnvolvidoId" name="EnvolvidoId" type="hidden">
+<div><input type="hidden" name="Lembretes[0].Dias" value="1"><span title="Remover lembrete" onclick="this.parentNode.remove()">x</span></div>
+<div><input type="hidden" name="Lembretes[1].Dias" value="2"><span title="Remover lembrete" onclick="this.parentNode.remove()">x</span></div>
+<label><input id="Maintain" name="Maintain" type="checkbox" value="true" checked> Manter dados</label>
+<button type="submit" name="ButtonSave" value="1">Salvar</button>
+</form>
+<script>{script}</script>
+</body></html>"""
+
+class EstadoServidor:
+    '''Sessões, tokens e tarefas criadas no servidor simulado.'''
+
+    def __init__(self, latencia_ms=0):
+        self.latencia = latencia_ms / 1000
+        self.lock = threading.Lock()
+        self.sessoes = set()
+        self.tokens = set()
+        self.tarefas = {}
+        self.duplicadas = 0
+
+    def registrar_tarefa(self, id_andamento, campos):
+        with self.lock:
+            if id_andamento in self.tarefas:
+                self.duplicadas += 1
+            self.tarefas[id_andamento] = campos
+
+class ManipuladorLawSystem(BaseHTTPRequestHandler):
+    '''Atende as rotas simuladas do LawSystem.'''
+
+    estado = None
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        pass
+
+    def _sessao_ativa(self):
+        for parte in self.headers.get("Cookie", "").split(";"):
+            nome, _, valor = parte.strip().partition("=")
+            if nome == "sessao" and valor in self.estado.sessoes:
+                return True
+        return False
+
+    def _responder(self, status, corpo="", tipo="text/html; charset=utf-8", cabecalhos=None):
+        dados = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _redirecionar(self, destino, cabecalhos=None):
+        self._responder(302, cabecalhos={"Location": destino, **(cabecalhos or {})})
+
+    def _ler_formulario(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        campos = parse_qs(self.rfile.read(tamanho).decode("utf-8"), keep_blank_values=True)
+        return {nome: valores[-1] for nome, valores in campos.items()}
+
+    def _pagina_cadastro(self, parametros, erro=""):
+        token = secrets.token_hex(8)
+        with self.estado.lock:
+            self.estado.tokens.add(token)
+        return PAGINA_CADASTRO.format(
+            erro=erro,
+            acao=html.escape("/tarefas/createFromAndamento?" + urlencode(parametros)),
+            token=token,
+            id_andamento=html.escape(parametros.get("idAnd", "")),
+            script=SCRIPT_AUTOCOMPLETE,
+        )
+
+    def do_GET(self): # pylint: disable=invalid-name
+        time.sleep(self.estado.latencia)
+        url = urlparse(self.path)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+
+        if url.path == "/login":
+            self._responder(200, PAGINA_LOGIN.format(erro=""))
+        elif not self._sessao_ativa():
+            self._redirecionar("/login")
+        elif url.path == CAMINHO_INICIAL:
+            self._responder(200, "<html><body>Início</body></html>")
+        elif url.path == "/tarefas":
+            self._responder(200, "<html><body>Tarefas</body></html>")
+        elif url.path == "/tarefas/createFromAndamento":
+            self._responder(200, self._pagina_cadastro(parametros))
+        elif url.path == "/tarefas/salvo":
+            # Como no LawSystem, a página exibida após salvar responde 404 com o marcador de sucesso
+            self._responder(404, f"<html><body><h1>{MARCADOR_SUCESSO}</h1></body></html>")
+        elif url.path == "/autocomplete":
+            termo = parametros.get("termo", "")
+            opcoes = [{"rotulo": f"{termo} ({i})", "valor": f"{parametros.get('campo', '')}:{termo}:{i}"} for i in range(OPCOES_AUTOCOMPLETE)]
+            self._responder(200, json.dumps(opcoes), tipo="application/json")
+        else:
+            self._responder(404, "<html><body>Não encontrado</body></html>")
+
+    def do_POST(self): # pylint: disable=invalid-name
+        time.sleep(self.estado.latencia)
+        url = urlparse(self.path)
+        campos = self._ler_formulario()
+
+        if url.path == "/login":
+            if campos.get("Username") == USUARIO and campos.get("Password") == SENHA:
+                sessao = secrets.token_hex(16)
+                with self.estado.lock:
+                    self.estado.sessoes.add(sessao)
+                self._redirecionar(CAMINHO_INICIAL, {"Set-Cookie": f"sessao={sessao}; Path=/; HttpOnly"})
+            else:
+                self._responder(200, PAGINA_LOGIN.format(erro="<div><div>Usuário ou senha inválidos.</div></div>"))
+        elif url.path == "/tarefas/createFromAndamento" and self._sessao_ativa():
+            parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+            with self.estado.lock:
+                token_valido = campos.get("__RequestVerificationToken") in self.estado.tokens
+                self.estado.tokens.discard(campos.get("__RequestVerificationToken"))
+            faltando = [campo for campo in CAMPOS_OBRIGATORIOS if not campos.get(campo)]
+            if not token_valido or faltando:
+                self._responder(200, self._pagina_cadastro(parametros, f"<div class='erro'>Campos inválidos: {', '.join(faltando) or 'token'}</div>"))
+                return
+            self.estado.registrar_tarefa(parametros.get("idAnd"), campos)
+            self._redirecionar("/tarefas/salvo")
+        else:
+            self._redirecionar("/login")
+
+def iniciar_servidor(latencia_ms=0, porta=0):
+    """
+    Inicia o servidor simulado em segundo plano e retorna (servidor, estado).
+    Com porta 0 o sistema escolhe uma porta livre (servidor.server_port).
+    """
+    estado = EstadoServidor(latencia_ms)
+    manipulador = type("Manipulador", (ManipuladorLawSystem,), {"estado": estado})
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), manipulador)
+    threading.Thread(target=servidor.serve_forever, name="servidor-lawsystem", daemon=True).start()
+    return servidor, estado
+
+if __name__ == "__main__":
+    servidor_local, _ = iniciar_servidor(porta=8000)
+    print(f"[INFO] Servidor simulado em http://127.0.0.1:{servidor_local.server_port} (usuário/senha: {USUARIO}/{SENHA})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor_local.shutdown()
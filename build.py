@@ -1,12 +1,41 @@
-"""Cria o executável do projeto."""
+"""
+Cria o executável do projeto.
+
+Perfis:
+    onefile    executável único (padrão), descompactado a cada execução
+    otimizado  pasta (onedir) com bytecode otimizado, sem os módulos pesados não
+               usados em tempo de execução e com a tabela de-para já compilada
+
+Uso:
+    python build.py [--perfil otimizado]
+    python build.py --comparar --repeticoes 5
+"""
 # pylint: disable=broad-exception-caught
 # pylint: disable=line-too-long
+# pylint: disable=import-outside-toplevel
 
+import argparse
+import os
 import shutil
+import statistics
 import subprocess
+import sys
+import tempfile
+import time
 from pathlib import Path
 from dotenv import dotenv_values
 
+PERFIL_ONEFILE = "onefile"
+PERFIL_OTIMIZADO = "otimizado"
+NOME_EXECUTAVEL = "autotask"
+DIST_OTIMIZADO = "dist/otimizado"
+
+# Usados apenas para compilar o de-para ou no desenvolvimento; o perfil otimizado não os distribui
+MODULOS_EXCLUIDOS = (
+    "pandas", "numpy", "openpyxl", "requests", "dotenv", "piptools",
+    "tkinter", "matplotlib", "IPython", "pytest",
+)
+
 def criar_app_py(app_script):
     """Cria dinamicamente um app.py para rodar como entrada do executável."""
     print("[INFO] Criando arquivo temporário 'app.py'...")
@@ -25,8 +54,10 @@ def criar_app_py(app_script):
         app_content += f"    os.environ[\"{key}\"] = \"{value}\"\n"
 
     # Configura o caminho do Playwright
+    # Fora do Windows vale o diretório padrão do Playwright (ver inicializacao.diretorio_navegadores)
     app_content += "    localappdata = os.getenv(\"LOCALAPPDATA\")\n"
-    app_content += "    os.environ[\"PLAYWRIGHT_BROWSERS_PATH\"] = f\"{localappdata}\\\\ms-playwright\"\n"
+    app_content += "    if localappdata:\n"
+    app_content += "        os.environ[\"PLAYWRIGHT_BROWSERS_PATH\"] = f\"{localappdata}\\\\ms-playwright\"\n"
 
     # Inicializa o projeto
     app_content += "    main.log_step(\"Iniciando o projeto\")\n"
@@ -38,9 +69,43 @@ def criar_app_py(app_script):
 
     print("[INFO] Arquivo 'app.py' criado com sucesso!")
 
-def build():
+def compilar_de_para_para_build(de_para_file, destino):
+    """Compila a planilha de-para na tabela usada em tempo de execução pelo perfil otimizado."""
+    sys.path.insert(0, str(Path("app").resolve()))
+    from de_para import exportar_de_para
+    Path(destino).parent.mkdir(parents=True, exist_ok=True)
+    mapa = exportar_de_para(de_para_file, destino)
+    print(f"[INFO] Tabela de-para compilada com {len(mapa)} responsáveis.")
+
+def comando_otimizado(main_script, de_para_compilado, icon_file):
+    """Monta o comando do PyInstaller para o perfil otimizado."""
+    command = [
+        "pyinstaller",
+        "--onedir",  # Pasta descompactada: nada é extraído para um diretório temporário a cada execução
+        "--name", NOME_EXECUTAVEL,
+        "--distpath", DIST_OTIMIZADO,
+        "--optimize", "1",  # Bytecode pré-compilado com otimização
+        "--noupx",  # Binários sem compressão carregam mais rápido
+        "--add-data", f"{de_para_compilado}{os.pathsep}resource",
+        "--noconfirm",
+    ]
+    for modulo in MODULOS_EXCLUIDOS:
+        command.extend(["--exclude-module", modulo])
+    if Path(icon_file).exists():
+        command.extend(["--icon", icon_file])
+    command.append(main_script)
+    return command
+
+def caminho_executavel(perfil):
+    """Caminho do executável gerado pelo perfil."""
+    nome = NOME_EXECUTAVEL + (".exe" if os.name == "nt" else "")
+    if perfil == PERFIL_OTIMIZADO:
+        return Path(DIST_OTIMIZADO) / NOME_EXECUTAVEL / nome
+    return Path("dist") / nome
+
+def build(perfil=PERFIL_ONEFILE):
     """Cria o executável do projeto."""
-    print("[INFO] Iniciando o empacotamento do projeto...")
+    print(f"[INFO] Iniciando o empacotamento do projeto (perfil {perfil})...")
 
     # Caminhos e arquivos necessários
     main_script = "app/app.py"  # Script principal do projeto
@@ -72,13 +137,17 @@ def build():
 
     # Executa o comando
     try:
+        if perfil == PERFIL_OTIMIZADO:
+            de_para_compilado = str(Path("build") / "de_para" / Path(de_para_file).with_suffix(".pickle").name)
+            compilar_de_para_para_build(de_para_file, de_para_compilado)
+            command = comando_otimizado(main_script, de_para_compilado, icon_file)
         criar_app_py(main_script)  # Cria o app.py dinâmico antes de empacotar
         if not Path(main_script).exists():
             print(f"[ERRO] Arquivo principal '{main_script}' não encontrado.")
             return
         subprocess.run(command, check=True)
         print("[INFO] Empacotamento concluído com sucesso!")
-        print("[INFO] Verifique o executável na pasta 'dist/'.")
+        print(f"[INFO] Verifique o executável em '{caminho_executavel(perfil)}'.")
     except subprocess.CalledProcessError as e:
         print(f"[ERRO] Falha no empacotamento: {e}")
     except Exception as e:
@@ -91,5 +160,50 @@ def build():
         if Path("build").exists():
             shutil.rmtree("build")
 
+def medir_inicializacao(executavel, repeticoes):
+    """
+    Executa o binário até o ponto da primeira consulta (AUTOTASK_TESTE_INICIALIZACAO)
+    e retorna os tempos, em segundos. A primeira execução, que grava os caches
+    locais, não é contada.
+    """
+    tempos = []
+    with tempfile.TemporaryDirectory() as diretorio_estado:
+        env = {**os.environ, "AUTOTASK_TESTE_INICIALIZACAO": "1", "AUTOTASK_DIR_ESTADO": diretorio_estado, "AUTOTASK_EVENTOS": "0"}
+        for indice in range(repeticoes + 1):
+            inicio = time.perf_counter()
+            subprocess.run([str(executavel)], env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
+            if indice:
+                tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+def comparar_inicializacao(repeticoes):
+    """Gera os dois perfis e compara o tempo do lançamento até a primeira consulta."""
+    resultados = {}
+    for perfil in (PERFIL_ONEFILE, PERFIL_OTIMIZADO):
+        build(perfil)
+        executavel = caminho_executavel(perfil)
+        if not executavel.exists():
+            print(f"[ERRO] Executável do perfil {perfil} não encontrado em '{executavel}'.")
+            return
+        resultados[perfil] = medir_inicializacao(executavel, repeticoes)
+
+    print("[INFO] ===== Inicialização até a primeira consulta =====")
+    for perfil, tempos in resultados.items():
+        print(f"[INFO] {perfil}: mediana {statistics.median(tempos):.2f} s | mínimo {min(tempos):.2f} s | {len(tempos)} execuções")
+    ganho = statistics.median(resultados[PERFIL_ONEFILE]) - statistics.median(resultados[PERFIL_OTIMIZADO])
+    print(f"[INFO] Diferença da mediana (onefile - otimizado): {ganho:.2f} s")
+
+def main():
+    """Lê os argumentos de linha de comando e executa o empacotamento."""
+    parser = argparse.ArgumentParser(description="Cria o executável do projeto.")
+    parser.add_argument("--perfil", choices=[PERFIL_ONEFILE, PERFIL_OTIMIZADO], default=PERFIL_ONEFILE, help="Perfil de empacotamento.")
+    parser.add_argument("--comparar", action="store_true", help="Gera os dois perfis e compara o tempo de inicialização.")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Execuções medidas por perfil na comparação.")
+    args = parser.parse_args()
+    if args.comparar:
+        comparar_inicializacao(max(1, args.repeticoes))
+    else:
+        build(args.perfil)
+
 if __name__ == "__main__":
-    build()
+    main()